@@ -1,70 +1,182 @@
-
-
 import argparse
-import matplotlib.pyplot as plt
+import json
 import sys
-sys.path.append('../')
-import algo3
-import dynamic
-
-
-
-import matplotlib.pyplot as plt
-from collections import Counter
-
-from collections import Counter
-import matplotlib.pyplot as plt
-
-def stats(path_1, path_2):
-    count_tokens_gold = 0
-    count_tokens_second = 0
-    count_good = 0
-    mots_bons = 0
-
-    len_gold = Counter()
-    len_second = Counter()
-
-    with open(path_1, "r", encoding="utf-8") as gold, open(path_2, "r", encoding="utf-8") as second:
-        lines_gold = gold.readlines()
-        lines_second = second.readlines()
-
-        for line_gold, line_second in zip(lines_gold, lines_second):
-            tab_gold = line_gold.strip().split()
-            tab_second = line_second.strip().split()
-
-            count_tokens_gold += len(tab_gold)
-            count_tokens_second += len(tab_second)
-
-            for token in tab_gold:
-                len_gold[len(token)] += 1
-            for token in tab_second:
-                len_second[len(token)] += 1
-
-            # Parcours intelligent sans chevauchement
-            idx_second = 0
-            success = True
-            for token_gold in tab_gold:
-                target = token_gold
-                composed = ""
-                while len(composed) < len(target) and idx_second < len(tab_second):
-                    composed += tab_second[idx_second]
-                    idx_second += 1
-                if composed != target:
-                    success = False
-                    break
-
-            if success and idx_second == len(tab_second):  # Tous les tokens utilisés, dans l'ordre
-                count_good += len(tab_gold)
-                mots_bons+=1
-            else:
-                print(f"mots tokenisés différemment : {tab_gold} / {tab_second}")
-
-    print(f"Nombre total de tokens - 1ère version : {count_tokens_gold}")
-    print(f" Nombre total de tokens - 2e version   : {count_tokens_second}")
-    print(f"Nombre de mots correctement tokenisés: {mots_bons}")
-    print(f" Nombre de tokens correpondants : {count_good}")
-
-    all_lengths = sorted(set(len_gold.keys()) | set(len_second.keys()))
+from array import array
+from collections import Counter, deque
+from itertools import accumulate, islice
+
+# Évaluation de l'accord entre deux segmentations (un mot par ligne, tokens
+# séparés par des espaces) : les fichiers sont lus en parallèle par blocs de
+# lignes, éventuellement répartis sur plusieurs processus, et chaque ligne
+# est comparée par ses frontières (offsets entiers en caractères) sans
+# reconstruire de chaînes.
+
+
+def boundary_offsets(tokens):
+    """
+    Frontières internes d'une segmentation : positions (en caractères du mot)
+    où commence chaque token sauf le premier.
+
+    Returns:
+        array: array('i') croissant
+    """
+    return array('i', accumulate(len(token) for token in tokens[:-1]))
+
+
+class SegmentationScores:
+    """Compteurs cumulables (merge) d'une comparaison de segmentations."""
+
+    def __init__(self, max_examples=10):
+        self.lines = 0
+        self.tokens_gold = 0
+        self.tokens_second = 0
+        self.words_correct = 0
+        self.tokens_correct = 0
+        # Lignes dont les tokens ne recomposent pas le même mot : exclues des frontières
+        self.misaligned = 0
+        self.boundaries_gold = 0
+        self.boundaries_second = 0
+        self.boundaries_correct = 0
+        self.len_gold = Counter()
+        self.len_second = Counter()
+        self.max_examples = max_examples
+        self.examples = []
+
+    def add_line(self, line_gold, line_second):
+        tab_gold = line_gold.split()
+        tab_second = line_second.split()
+        self.lines += 1
+        self.tokens_gold += len(tab_gold)
+        self.tokens_second += len(tab_second)
+        self.len_gold.update(map(len, tab_gold))
+        self.len_second.update(map(len, tab_second))
+
+        if "".join(tab_gold) != "".join(tab_second):
+            self.misaligned += 1
+            self._example(tab_gold, tab_second)
+            return
+        gold = boundary_offsets(tab_gold)
+        second = boundary_offsets(tab_second)
+        correct = len(set(gold).intersection(second))
+        self.boundaries_gold += len(gold)
+        self.boundaries_second += len(second)
+        self.boundaries_correct += correct
+        # Mot bien tokenisé : chaque token de référence est une suite de tokens testés
+        if correct == len(gold):
+            self.words_correct += 1
+            self.tokens_correct += len(tab_gold)
+        else:
+            self._example(tab_gold, tab_second)
+
+    def _example(self, tab_gold, tab_second):
+        if len(self.examples) < self.max_examples:
+            self.examples.append([tab_gold, tab_second])
+
+    def merge(self, other):
+        for name in ("lines", "tokens_gold", "tokens_second", "words_correct", "tokens_correct", "misaligned",
+                     "boundaries_gold", "boundaries_second", "boundaries_correct"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.len_gold.update(other.len_gold)
+        self.len_second.update(other.len_second)
+        self.examples.extend(other.examples[:self.max_examples - len(self.examples)])
+        return self
+
+    def to_dict(self):
+        precision = self.boundaries_correct / self.boundaries_second if self.boundaries_second else 0.0
+        recall = self.boundaries_correct / self.boundaries_gold if self.boundaries_gold else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return {
+            "lines": self.lines,
+            "tokens_gold": self.tokens_gold,
+            "tokens_second": self.tokens_second,
+            "words_correct": self.words_correct,
+            "tokens_correct": self.tokens_correct,
+            "misaligned_lines": self.misaligned,
+            "boundaries": {
+                "gold": self.boundaries_gold,
+                "second": self.boundaries_second,
+                "correct": self.boundaries_correct,
+                "precision": precision,
+                "recall": recall,
+                "f1": f1,
+            },
+            "length_histogram": {
+                "gold": {str(k): v for k, v in sorted(self.len_gold.items())},
+                "second": {str(k): v for k, v in sorted(self.len_second.items())},
+            },
+            "examples": self.examples,
+        }
+
+
+def _score_chunk(pairs, max_examples=10):
+    scores = SegmentationScores(max_examples)
+    for line_gold, line_second in pairs:
+        scores.add_line(line_gold, line_second)
+    return scores
+
+
+def _read_chunks(gold, second, chunk_lines, unmatched):
+    # Blocs de lignes lus en parallèle dans les deux fichiers ; si l'un est
+    # plus long, le nombre de lignes en trop est ajouté à `unmatched`
+    while True:
+        lines_gold = list(islice(gold, chunk_lines))
+        lines_second = list(islice(second, chunk_lines))
+        if lines_gold and lines_second:
+            yield list(zip(lines_gold, lines_second))
+        if len(lines_gold) != len(lines_second):
+            longer = gold if len(lines_gold) > len(lines_second) else second
+            unmatched.append(abs(len(lines_gold) - len(lines_second)) + sum(1 for _ in longer))
+            return
+        if not lines_gold:
+            return
+
+
+def evaluate(path_gold, path_second, chunk_lines=10000, num_workers=None, max_examples=10):
+    """
+    Compare deux segmentations ligne à ligne, en flux.
+
+    Args:
+        path_gold (str): segmentation de référence, un mot par ligne
+        path_second (str): segmentation testée, même mot à chaque ligne
+        chunk_lines (int): lignes par bloc (lecture et envoi aux processus)
+        num_workers (int | None): nombre de processus ; séquentiel si None
+        max_examples (int): nombre de lignes divergentes gardées en exemple
+    Returns:
+        dict: comptes de tokens et de mots, précision / rappel / F1 sur les
+            frontières, histogrammes des longueurs de tokens, exemples
+    """
+    scores = SegmentationScores(max_examples)
+    unmatched = []
+    with open(path_gold, "r", encoding="utf-8") as gold, open(path_second, "r", encoding="utf-8") as second:
+        chunks = _read_chunks(gold, second, chunk_lines, unmatched)
+        if not num_workers:
+            for pairs in chunks:
+                scores.merge(_score_chunk(pairs, max_examples))
+        else:
+            # Import différé : pool de processus seulement en mode parallèle
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                # Nombre borné de blocs en vol : mémoire indépendante de la taille des fichiers
+                pending = deque()
+                for pairs in chunks:
+                    pending.append(executor.submit(_score_chunk, pairs, max_examples))
+                    if len(pending) >= 2 * num_workers:
+                        scores.merge(pending.popleft().result())
+                while pending:
+                    scores.merge(pending.popleft().result())
+    result = scores.to_dict()
+    result["unmatched_lines"] = sum(unmatched)
+    return result
+
+
+def plot_histogram(result, output=None):
+    """Histogramme des longueurs de tokens ; enregistré dans `output` ou affiché."""
+    # Import différé : matplotlib n'est chargé que pour tracer l'histogramme
+    import matplotlib.pyplot as plt
+
+    len_gold = {int(k): v for k, v in result["length_histogram"]["gold"].items()}
+    len_second = {int(k): v for k, v in result["length_histogram"]["second"].items()}
+    all_lengths = sorted(set(len_gold) | set(len_second))
     plt.bar(all_lengths, [len_gold.get(k, 0) for k in all_lengths], width=0.4, label="Tokens1", align="edge", alpha=0.7)
     plt.bar(all_lengths, [len_second.get(k, 0) for k in all_lengths], width=-0.4, label="Tokens2", align="edge", alpha=0.7)
 
@@ -73,15 +185,46 @@ def stats(path_1, path_2):
     plt.xlabel("Taille (nb de caractères)")
     plt.ylabel("Fréquence")
     plt.grid(True)
-    plt.show()
+    if output:
+        plt.savefig(output)
+    else:
+        plt.show()
+
+
+def stats(path_1, path_2, plot=False, **kwargs):
+    result = evaluate(path_1, path_2, **kwargs)
+    for tab_gold, tab_second in result["examples"]:
+        print(f"mots tokenisés différemment : {tab_gold} / {tab_second}")
+    boundaries = result["boundaries"]
+    print(f"Nombre total de tokens - 1ère version : {result['tokens_gold']}")
+    print(f" Nombre total de tokens - 2e version   : {result['tokens_second']}")
+    print(f"Nombre de mots correctement tokenisés: {result['words_correct']}")
+    print(f" Nombre de tokens correpondants : {result['tokens_correct']}")
+    print(f"Frontières : précision {boundaries['precision']:.4f}, rappel {boundaries['recall']:.4f}, F1 {boundaries['f1']:.4f}")
+    if result["misaligned_lines"]:
+        print(f"Lignes dont les tokens ne recomposent pas le même mot : {result['misaligned_lines']}")
+    if result["unmatched_lines"]:
+        print(f"Attention : {result['unmatched_lines']} lignes sans correspondance (fichiers de longueurs différentes)")
+    if plot:
+        plot_histogram(result, plot if isinstance(plot, str) else None)
+    return result
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('path_to_text1',help="path to the reference tokenized text with the format 'token1 token2' and a word per line")
     parser.add_argument('path_to_text2',help="path to the tokenized text tested with the format 'token1 token2' and a word per line, it must have the same word at each line that the reference text")
+    parser.add_argument('--json', dest='json_output', help="write the scores as JSON to this file ('-' for stdout)")
+    parser.add_argument('--plot', nargs='?', const=True, default=False, help="plot the token length histogram (to this image file if given)")
+    parser.add_argument('--num_workers', type=int, default=None, help="number of processes (default: sequential)")
+    parser.add_argument('--chunk_lines', type=int, default=10000, help="lines per chunk")
+    parser.add_argument('--max_examples', type=int, default=10, help="mismatching lines kept as examples")
     args = parser.parse_args()
-    stats(args.path_to_text1,args.path_to_text2)
-
-
-
+    options = {"chunk_lines": args.chunk_lines, "num_workers": args.num_workers, "max_examples": args.max_examples}
+    if args.json_output == '-':
+        json.dump(evaluate(args.path_to_text1, args.path_to_text2, **options), sys.stdout, ensure_ascii=False, indent=2)
+    else:
+        result = stats(args.path_to_text1, args.path_to_text2, args.plot, **options)
+        if args.json_output:
+            with open(args.json_output, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
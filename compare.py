@@ -1,6 +1,11 @@
 import json
 import argparse
+import heapq
+import os
+import zlib
 from collections import Counter
+from array import array
+from operator import itemgetter
 
 
 def load_vocab(file_path):
@@ -52,16 +57,258 @@ def compare_vocabs(wordpiece_vocab, bpe_vocab):
     print("Exemples de tokens uniques à BPE :", list(unique_bpe)[:10])
 
 
+# Comparaison de nombreux vocabulaires (un par langue / modèle) : chaque
+# vocabulaire n'est lu qu'une fois et résumé par
+#   - une esquisse MinHash (les k plus petits hachages de ses tokens), qui
+#     suffit à estimer la similarité de Jaccard de chaque paire en O(k) ;
+#   - ses comptes dans un trie de préfixes (et un de suffixes) partagé par
+#     tous les vocabulaires ;
+#   - s'il y a des fréquences de corpus, un masque de bits (un bit par
+#     vocabulaire) pour chaque token fréquent, qui donne le recouvrement
+#     pondéré de toutes les paires sans revenir aux vocabulaires.
+
+
+def read_vocab(file_path):
+    """Tokens distincts d'un vocabulaire : JSON (liste ou dict token -> ID) ou texte, un token par ligne."""
+    if file_path.endswith(".json"):
+        return list(load_vocab(file_path))
+    with open(file_path, "r", encoding="utf-8") as f:
+        return list(dict.fromkeys(token for token in f.read().splitlines() if token))
+
+
+def load_frequencies(file_path):
+    """
+    Fréquences des tokens dans un corpus : JSON token -> compte, ou texte
+    tokenisé (tokens séparés par des espaces), compté en flux.
+    """
+    if file_path.endswith(".json"):
+        with open(file_path, "r", encoding="utf-8") as f:
+            return Counter(json.load(f))
+    freqs = Counter()
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            freqs.update(line.split())
+    return freqs
+
+
+def token_hashes(tokens):
+    """Hachages stables (CRC32 de l'UTF-8, identiques d'un processus à l'autre) des tokens."""
+    return map(zlib.crc32, map(str.encode, tokens))
+
+
+class MinHashSketch:
+    """Esquisse MinHash « bottom-k » : les k plus petits hachages des tokens d'un vocabulaire."""
+
+    def __init__(self, hashes, k=1024):
+        self.k = k
+        self.hashes = sorted(set(heapq.nsmallest(k, hashes)))
+
+    def jaccard(self, other):
+        """Estimation de |A ∩ B| / |A ∪ B| (exacte si les deux vocabulaires ont moins de k tokens)."""
+        mine = set(self.hashes)
+        theirs = set(other.hashes)
+        union = heapq.nsmallest(min(self.k, other.k), mine | theirs)
+        if not union:
+            return 0.0
+        return sum(1 for h in union if h in mine and h in theirs) / len(union)
+
+
+class AffixTrie:
+    """
+    Trie partagé des préfixes des tokens de plusieurs vocabulaires, limité à
+    `depth` caractères : chaque nœud compte, pour chaque vocabulaire, les
+    tokens qui commencent par ce préfixe. Pour les suffixes, on y insère les
+    tokens retournés (reverse=True).
+    """
+
+    def __init__(self, num_vocabs, depth=2, reverse=False):
+        self.num_vocabs = num_vocabs
+        self.depth = depth
+        self.reverse = reverse
+        # Nœud : [enfants (caractère -> nœud), comptes par vocabulaire]
+        self.root = [{}, array('I', bytes(4 * num_vocabs))]
+
+    def add(self, token, vocab_idx, count=1):
+        node = self.root
+        for char in (token[::-1] if self.reverse else token)[:self.depth]:
+            child = node[0].get(char)
+            if child is None:
+                child = node[0][char] = [{}, array('I', bytes(4 * self.num_vocabs))]
+            child[1][vocab_idx] += count
+            node = child
+
+    def _nodes(self, depth):
+        stack = [("", self.root, 0)]
+        while stack:
+            key, node, level = stack.pop()
+            if level == depth:
+                yield (key[::-1] if self.reverse else key), node[1]
+                continue
+            for char, child in node[0].items():
+                stack.append((key + char, child, level + 1))
+
+    def most_common(self, vocab_idx, top_n=10, depth=None):
+        """Les `top_n` préfixes (ou suffixes) de longueur `depth` les plus fréquents d'un vocabulaire."""
+        nodes = ((key, counts[vocab_idx]) for key, counts in self._nodes(depth or self.depth))
+        return heapq.nsmallest(top_n, (item for item in nodes if item[1]), key=lambda item: (-item[1], item[0]))
+
+    def shared(self, depth=None):
+        """Nombre de préfixes (ou suffixes) de longueur `depth` présents dans tous les vocabulaires."""
+        return sum(1 for _, counts in self._nodes(depth or self.depth) if all(counts))
+
+
+def compare_many(paths, freqs=None, num_hashes=1024, affix_depth=2, top_n=10):
+    """
+    Compare plusieurs vocabulaires en une seule lecture de chacun.
+
+    Args:
+        paths (List[str]): fichiers de vocabulaire (voir read_vocab)
+        freqs (dict | None): fréquences des tokens dans un corpus (voir load_frequencies)
+        num_hashes (int): taille des esquisses MinHash
+        affix_depth (int): longueur des préfixes / suffixes comptés
+        top_n (int): nombre de préfixes, suffixes et tokens partagés rapportés
+    Returns:
+        dict: par vocabulaire (taille, longueur moyenne, préfixes, suffixes,
+            couverture du corpus) et par paire (Jaccard estimé, taille estimée
+            de l'intersection, recouvrement pondéré par les fréquences)
+    """
+    names = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    prefixes = AffixTrie(len(paths), affix_depth)
+    suffixes = AffixTrie(len(paths), affix_depth, reverse=True)
+    sketches = []
+    sizes = []
+    lengths = []
+    # Token fréquent -> vocabulaires qui le contiennent (un bit par vocabulaire)
+    masks = {}
+
+    for idx, path in enumerate(paths):
+        tokens = read_vocab(path)
+        sketches.append(MinHashSketch(token_hashes(tokens), num_hashes))
+        sizes.append(len(tokens))
+        lengths.append(sum(map(len, tokens)) / len(tokens) if tokens else 0.0)
+        # Les tokens partageant leurs `affix_depth` premiers (derniers) caractères
+        # ne font qu'une insertion dans le trie
+        for prefix, count in Counter(map(itemgetter(slice(None, affix_depth)), tokens)).items():
+            prefixes.add(prefix, idx, count)
+        for suffix, count in Counter(map(itemgetter(slice(-affix_depth, None)), tokens)).items():
+            suffixes.add(suffix, idx, count)
+        if freqs is not None:
+            bit = 1 << idx
+            for token in freqs.keys() & tokens:
+                masks[token] = masks.get(token, 0) | bit
+
+    # Masse de fréquence de chaque combinaison de vocabulaires
+    mass = Counter()
+    for token, mask in masks.items():
+        mass[mask] += freqs[token]
+    total = sum(freqs.values()) if freqs else 0
+    # Une seule passe sur les combinaisons : masse couverte par chaque
+    # vocabulaire et masse partagée par chaque paire
+    covered = [0] * len(paths)
+    shared = [[0] * len(paths) for _ in paths]
+    for mask, m in mass.items():
+        bits = [i for i in range(len(paths)) if mask >> i & 1]
+        for pos, i in enumerate(bits):
+            covered[i] += m
+            row = shared[i]
+            for j in bits[pos + 1:]:
+                row[j] += m
+
+    vocabs = []
+    for idx, name in enumerate(names):
+        entry = {
+            "name": name,
+            "path": paths[idx],
+            "size": sizes[idx],
+            "avg_token_length": lengths[idx],
+            "top_prefixes": prefixes.most_common(idx, top_n),
+            "top_suffixes": suffixes.most_common(idx, top_n),
+        }
+        if freqs is not None:
+            entry["corpus_coverage"] = covered[idx] / total if total else 0.0
+        vocabs.append(entry)
+
+    pairs = []
+    for i in range(len(paths)):
+        for j in range(i + 1, len(paths)):
+            jaccard = sketches[i].jaccard(sketches[j])
+            pair = {
+                "a": names[i],
+                "b": names[j],
+                "jaccard": jaccard,
+                "common_tokens": round(jaccard * (sizes[i] + sizes[j]) / (1 + jaccard)),
+            }
+            if freqs is not None:
+                either = covered[i] + covered[j] - shared[i][j]
+                pair["weighted_overlap"] = shared[i][j] / either if either else 0.0
+            pairs.append(pair)
+
+    result = {
+        "vocabs": vocabs,
+        "pairs": pairs,
+        "shared_prefixes": prefixes.shared(),
+        "shared_suffixes": suffixes.shared(),
+    }
+    if freqs is not None:
+        # Tokens présents dans au moins deux vocabulaires, par fréquence décroissante
+        overlapping = (token for token, mask in masks.items() if mask & (mask - 1))
+        result["top_shared_tokens"] = [
+            {"token": token, "frequency": freqs[token],
+             "vocabs": [names[i] for i in range(len(names)) if masks[token] >> i & 1]}
+            for token in heapq.nsmallest(top_n, overlapping, key=lambda token: (-freqs[token], token))
+        ]
+    return result
+
+
+def print_comparison(result):
+    """Affiche le résultat de compare_many."""
+    print("\nComparaison des vocabulaires")
+    for vocab in result["vocabs"]:
+        line = f"{vocab['name']} : {vocab['size']} tokens, longueur moyenne {vocab['avg_token_length']:.2f}"
+        if "corpus_coverage" in vocab:
+            line += f", couverture du corpus {vocab['corpus_coverage'] * 100:.2f}%"
+        print(line)
+        print("  préfixes :", vocab["top_prefixes"])
+        print("  suffixes :", vocab["top_suffixes"])
+
+    print(f"\nPréfixes communs à tous les vocabulaires : {result['shared_prefixes']}")
+    print(f"Suffixes communs à tous les vocabulaires : {result['shared_suffixes']}\n")
+
+    print("Similarité de Jaccard estimée (MinHash)")
+    for pair in result["pairs"]:
+        line = f"{pair['a']} / {pair['b']} : {pair['jaccard']:.3f} (~{pair['common_tokens']} tokens en commun)"
+        if "weighted_overlap" in pair:
+            line += f", recouvrement pondéré {pair['weighted_overlap']:.3f}"
+        print(line)
+
+    if "top_shared_tokens" in result:
+        print("\nTokens partagés les plus fréquents dans le corpus")
+        for entry in result["top_shared_tokens"]:
+            print(f"{entry['token']!r} : {entry['frequency']} ({', '.join(entry['vocabs'])})")
+
+
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Compare deux vocabulaires JSON (WordPiece vs BPE).")
-    parser.add_argument("wordpiece_vocab", type=str, help="Fichier JSON du vocabulaire WordPiece")
-    parser.add_argument("bpe_vocab", type=str, help="Fichier JSON du vocabulaire BPE")
+    parser = argparse.ArgumentParser(description="Compare des vocabulaires (WordPiece vs BPE, ou un par langue / modèle).")
+    parser.add_argument("vocabs", nargs="+", help="Fichiers de vocabulaire (JSON, ou texte avec un token par ligne)")
+    parser.add_argument("--freqs", help="Fréquences du corpus : JSON token -> compte, ou texte tokenisé")
+    parser.add_argument("--sketch", action="store_true",
+                        help="Comparaison par esquisses MinHash même pour deux vocabulaires")
+    parser.add_argument("--num_hashes", type=int, default=1024, help="Taille des esquisses MinHash")
+    parser.add_argument("--depth", type=int, default=2, help="Longueur des préfixes / suffixes")
+    parser.add_argument("--top", type=int, default=10, help="Nombre d'éléments rapportés")
+    parser.add_argument("--json", dest="json_output", help="Écrit le résultat en JSON dans ce fichier")
 
     args = parser.parse_args()
 
-    # Charger les vocabulaires
-    wordpiece_vocab = load_vocab(args.wordpiece_vocab)
-    bpe_vocab = load_vocab(args.bpe_vocab)
-
-    # Comparer
-    compare_vocabs(wordpiece_vocab, bpe_vocab)
+    if len(args.vocabs) == 2 and not (args.sketch or args.freqs or args.json_output):
+        # Comparaison exacte de deux vocabulaires
+        wordpiece_vocab = load_vocab(args.vocabs[0])
+        bpe_vocab = load_vocab(args.vocabs[1])
+        compare_vocabs(wordpiece_vocab, bpe_vocab)
+    else:
+        freqs = load_frequencies(args.freqs) if args.freqs else None
+        result = compare_many(args.vocabs, freqs, args.num_hashes, args.depth, args.top)
+        print_comparison(result)
+        if args.json_output:
+            with open(args.json_output, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
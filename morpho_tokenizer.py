@@ -2,112 +2,142 @@ import argparse
 import random
 import os
 import sys
+from collections import Counter
 
-def read_data(path):
-    data = list()
-    try:
-        with open(path, 'r', encoding='utf-8') as instream:
-            cols = next(instream).strip().split(",")
-            for line in instream:
-                data.append({
-                    k: v for k, v in zip(cols, line.strip().split(","))
-                })
-        return data
-    except FileNotFoundError:
-        print(f"Error: File not found: {path}")
-        sys.exit(1)
-    except Exception as e:
-        print(f"Error reading file {path}: {e}")
-        sys.exit(1)
+from tokenization.lexicon_index import iter_lexicon_rows, open_language_index, open_lexicon_index, reservoir_sample
+from tokenization.lru_cache import LRUCache
 
-def read_data_dict(path):
-    data = dict()
+def open_index(csv_path, index_path=None):
+    # Index mmappé mot -> segmentation, construit une seule fois à partir du CSV
     try:
-        with open(path, 'r', encoding='utf-8') as instream:
-            cols = next(instream).strip().split(",")
-            key_field = cols[0]
-            for line in instream:
-                values = line.strip().split(",")
-                if len(values) != len(cols):
-                    print(f"Warning: Skipping line due to mismatch in columns: {line.strip()}")
-                    continue
-                entry = {k: v for k, v in zip(cols, values)}
-                data[entry[key_field]] = entry
-        return data
+        index = open_lexicon_index(csv_path, index_path)
     except FileNotFoundError:
-        print(f"Error: File not found: {path}")
+        print(f"Error: File not found: {csv_path}")
         sys.exit(1)
     except Exception as e:
-        print(f"Error reading file {path}: {e}")
+        print(f"Error reading file {csv_path}: {e}")
         sys.exit(1)
+    skipped = index.meta.get("skipped_lines", 0)
+    if skipped:
+        print(f"Warning: Skipped {skipped} lines of {csv_path} due to mismatch in columns")
+    return index
 
-def tokenize_text(text_path, output_path, data):
+def tokenize_text(text_path, output_path, index, batch_bytes=1 << 20, cache_size=100000):
     if not os.path.exists(text_path):
         print(f"Error: Text file does not exist: {text_path}")
         sys.exit(1)
 
     print("Tokenizing text...")
+    # Lecture et écriture par lots d'environ batch_bytes octets ; les mots
+    # absents du lexique sont comptés au lieu d'être signalés un par un.
+    # Les mots fréquents sont servis par un cache LRU borné.
+    misses = Counter()
+    cache = LRUCache(cache_size)
     try:
-        with open(text_path, 'r', encoding="utf-8") as texte:
-            lines = texte.readlines()
-            with open(output_path, 'w', encoding="utf-8") as output:
+        with open(text_path, 'r', encoding="utf-8") as texte, \
+                open(output_path, 'w', encoding="utf-8") as output:
+            while True:
+                lines = texte.readlines(batch_bytes)
+                if not lines:
+                    break
+                batch = []
                 for line in lines:
                     key = line.strip()
-                    if key in data:
-                        to_write = data[key]["segmentation"].replace('-', ' ')
-                        output.write(to_write + "\n")
+                    tokens = cache.get(key)
+                    if tokens is None:
+                        segmentation = index.get(key)
+                        tokens = segmentation.replace('-', ' ') if segmentation is not None else False
+                        cache.put(key, tokens)
+                    if tokens is False:
+                        misses[key] += 1
                     else:
-                        print(f"Warning: Word not found in data: '{key}'")
+                        batch.append(tokens)
+                if batch:
+                    output.write("\n".join(batch) + "\n")
+        if misses:
+            print(f"Warning: {sum(misses.values())} words not found in data ({len(misses)} distinct), "
+                  f"most frequent: {', '.join(repr(w) for w, _ in misses.most_common(10))}")
         print(f"Tokenization completed. Output written to {output_path}")
     except Exception as e:
         print(f"Error during tokenization: {e}")
         sys.exit(1)
+    return misses
 
-def tokenize_generator(output_path, data, num_words=1000, lang=None):
+class _Counted:
+    # Itérateur qui compte les éléments parcourus
+    def __init__(self, items):
+        self.items = iter(items)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self.items)
+        self.count += 1
+        return item
+
+def tokenize_generator(output_path, csv_path, num_words=1000, lang=None, lang_index=None):
+    # Échantillon uniforme de num_words mots du lexique, mémoire O(num_words) :
+    # avec lang_index, seules les lignes tirées sont lues dans le CSV ;
+    # sinon, une seule passe sur le CSV (échantillonnage par réservoir).
     print("Generating tokenized text...")
-    if lang is not None:
-        langs = lang.split()
-        data_lang = [word for word in data if word["lang"] in langs]
+    langs = lang.split() if lang is not None else None
+    if langs:
         print(f"Filtering on languages: {langs}")
-    else:
-        data_lang = data
 
-    if not data_lang:
-        print("Error: No data available for the selected language(s).")
+    try:
+        if lang_index is not None:
+            index = open_language_index(csv_path, None if lang_index is True else lang_index)
+            try:
+                available = index.count(langs)
+                final_data = index.sample(num_words, ["segmentation"], langs)
+            finally:
+                index.close()
+        else:
+            rows = iter_lexicon_rows(csv_path, ["segmentation"], langs)
+            counted = _Counted(rows)
+            final_data = reservoir_sample(counted, num_words)
+            random.shuffle(final_data)
+            available = counted.count
+    except FileNotFoundError:
+        print(f"Error: File not found: {csv_path}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error reading file {csv_path}: {e}")
         sys.exit(1)
 
-    if len(data_lang) < num_words:
-        print(f"Warning: Only {len(data_lang)} entries available, using all of them instead of requested {num_words}.")
-        final_data = data_lang
-    else:
-        final_data = random.sample(data_lang, num_words)
+    if not available:
+        print("Error: No data available for the selected language(s).")
+        sys.exit(1)
+    if available < num_words:
+        print(f"Warning: Only {available} entries available, using all of them instead of requested {num_words}.")
 
     try:
         with open(output_path, 'w', encoding="utf-8") as output:
-            for elem in final_data:
-                output.write(elem["segmentation"].replace('-', ' ') + "\n")
+            output.write("".join(segmentation.strip().replace('-', ' ') + "\n" for (segmentation,) in final_data))
         print(f"Generated text written to {output_path}")
     except Exception as e:
         print(f"Error writing to file {output_path}: {e}")
         sys.exit(1)
 
-def launcher(fun, output, text=None, num=None, lang=None):
+def launcher(fun, output, text=None, num=None, lang=None, index=None, lang_index=None):
     if fun == '1':
         if not text:
             print("Error: Text file path (-t) is required for function 1.")
             sys.exit(1)
-        data = read_data_dict('train.csv')
+        data = open_index('train.csv', index)
         tokenize_text(text, output, data)
 
     elif fun == '2':
-        if num: 
+        num_int = 1000
+        if num:
             try:
                 num_int = int(num)
             except ValueError:
                 print(f"Error: Provided number of words (-n) is not an integer: '{num}'")
                 sys.exit(1)
-        data = read_data('train.csv')
-        tokenize_generator(output, data, num_int, lang)
+        tokenize_generator(output, 'train.csv', num_int, lang, lang_index)
 
     else:
         print(f"Error: Unknown function '{fun}'. Choose '1' or '2'.")
@@ -120,5 +150,7 @@ if __name__ == '__main__':
     parser.add_argument('-t', default=None, help="(Requis pour fun 1) Chemin vers le texte à tokenizer.")
     parser.add_argument('-n', default=None, help="(Optionnel) Nombre de mots générés pour fun 2.")
     parser.add_argument('-l', default=None, help="(Optionnel) Langues dans lesquelles générer le texte, ex: 'fr en de'")
+    parser.add_argument('-i', default=None, help="(Optionnel) Fichier d'index du lexique pour fun 1 (défaut: train.csv.idx, construit s'il manque).")
+    parser.add_argument('-x', nargs='?', const=True, default=None, help="(Optionnel) Index des lignes par langue pour fun 2 (défaut: train.csv.langidx, construit s'il manque) : seules les lignes tirées sont lues.")
     args = parser.parse_args()
-    launcher(args.fun, args.output_path, args.t, args.n, args.l)
+    launcher(args.fun, args.output_path, args.t, args.n, args.l, args.i, args.x)
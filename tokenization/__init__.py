@@ -0,0 +1,33 @@
+"""
+Tokenizers BPE (NaiveBpe, DynamicBpe), Unigram et WordPiece.
+
+Les classes sont importées à la première utilisation (PEP 562) : importer
+le package ne charge ni regex ni les modules d'entraînement.
+"""
+import importlib
+
+_EXPORTS = {
+    "BaseTokenizer": "base_tokenizer",
+    "NaiveBpe": "naive_bpe",
+    "DynamicBpe": "dynamic_bpe",
+    "UnigramBPETokenizer": "unigram_bpe",
+    "WordPieceTokenizer": "worpiece_tokenizer",
+    "EncodedBatch": "encoded_batch",
+    "CharTrie": "char_trie",
+    "LRUCache": "lru_cache",
+    "LexiconIndex": "lexicon_index",
+    "MorphoSegmenter": "morpho",
+    "Profiler": "profiler",
+    "TrainingProgress": "profiler",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
@@ -1,10 +1,17 @@
 import os
 import json
+import codecs
+import warnings
 import regex as re
-import time
-import matplotlib.pyplot as plt
+from array import array
 from collections import Counter
-from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Mapping
+from .binary_model import dump_tokenizer, load_tokenizer_into
+from .char_trie import CharTrie
+from .encoded_batch import EncodedBatch
+from .lru_cache import LRUCache
+from .profiler import Profiler, TrainingProgress
+from time import perf_counter
 
 
 class BaseTokenizer:
@@ -13,43 +20,507 @@ class BaseTokenizer:
         self.vocab = set()
         # Règles de fusion (utilisées notamment par BPE)
         self.merges = {}
+        # Trie du vocabulaire pour la recherche du plus long match (construit à la demande)
+        self._vocab_trie = None
+        self._vocab_trie_key = None
+        # Cache LRU optionnel des encodages par mot / morceau (voir enable_cache)
+        self._cache = None
+        # Chronomètres et compteurs par phase, désactivés par défaut (voir enable_profiling)
+        self._profiler = None
+        # Table token `str` -> ID des vocabulaires en ensemble (voir token_to_id)
+        self._string_ids = None
+        self._string_ids_key = None
+        # Pré-segmentation morphologique optionnelle (voir enable_morpho_segmentation)
+        self._morpho = None
+
+    def __getstate__(self):
+        # Le profiler (et ses callbacks) reste dans le processus parent
+        state = self.__dict__.copy()
+        state["_profiler"] = None
+        return state
 
     def tokenize(self, text):
         # Méthode abstraite à implémenter dans les sous-classes (BPE, Unigram, etc.)
         raise NotImplementedError("Subclasses should implement this method.")
 
-    def greedy_tokenize(self, text):
+    def greedy_tokenize(self, text, return_offsets=False):
         """
         Méthode de tokenisation gloutonne (greedy) de gauche à droite.
         On choisit le plus long sous-mot possible à chaque étape.
 
         Args:
             text (str): texte brut à tokeniser
+            return_offsets (bool): renvoie aussi les spans (début, fin) de chaque
+                sous-token dans le texte d'origine
         Returns:
-            dict: mapping mot -> liste de sous-tokens
+            dict: mapping mot -> liste de sous-tokens ; avec return_offsets,
+                tuple (liste de tous les sous-tokens dans l'ordre,
+                array('i') à plat [début0, fin0, début1, fin1, ...])
         """
+        if return_offsets:
+            return self._greedy_tokenize_with_offsets(text)
         text = self.preprocess_text(text)
         tokens = {}
+        trie = self.get_vocab_trie()
         for word in text.split():
-            i = 0
-            word_tokens = []
-            while i < len(word):
-                match = None
-                # On teste les sous-chaînes les plus longues en premier
-                for j in range(len(word), i, -1):
-                    substr = word[i:j]
-                    if substr in self.vocab:
-                        match = substr
-                        word_tokens.append(match)
-                        i = j
-                        break
-                if not match:
-                    # Si aucun match, on découpe caractère par caractère
-                    word_tokens.append(word[i])
-                    i += 1
-            tokens[word] = word_tokens
+            tokens[word] = [word[i:j] for i, j in self._greedy_segment(trie, word)]
         return tokens
 
+    def _greedy_segment(self, trie, word):
+        # Bornes (i, j) des sous-mots les plus longs, caractère par caractère si aucun match
+        i = 0
+        while i < len(word):
+            # Plus long sous-mot du vocabulaire commençant en i
+            j = trie.longest_match(word, i)
+            if j == i:
+                # Si aucun match, on découpe caractère par caractère
+                j = i + 1
+            yield i, j
+            i = j
+
+    def _greedy_tokenize_with_offsets(self, text):
+        processed, char_map = self.preprocess_text_with_offsets(text)
+        trie = self.get_vocab_trie()
+        tokens = []
+        spans = array('i')
+        for match in re.finditer(r'\S+', processed):
+            word, start = match.group(), match.start()
+            for i, j in self._greedy_segment(trie, word):
+                tokens.append(word[i:j])
+                spans.append(char_map[start + i])
+                spans.append(char_map[start + j - 1] + 1)
+        return tokens, spans
+
+    def enable_cache(self, capacity=10000):
+        """
+        Active un cache LRU borné des encodages par mot / morceau, partagé
+        entre les appels à tokenize() et vidé automatiquement quand le modèle
+        change (train, load_from_json).
+
+        NaiveBpe et DynamicBpe n'encodent par morceaux (et ne passent donc
+        par le cache) que s'ils ont été entraînés avec dedup=True ou la
+        pré-segmentation morphologique : sinon le cache reste inutilisé et
+        un RuntimeWarning est émis.
+        """
+        self._cache = LRUCache(capacity)
+        if self.vocab:
+            self._warn_if_cache_unused()
+
+    def _uses_unit_cache(self):
+        # Vrai si tokenize() encode mot par mot / morceau par morceau (voir _encode_units)
+        return True
+
+    def _warn_if_cache_unused(self):
+        if self._cache is not None and not self._uses_unit_cache():
+            warnings.warn(f"{type(self).__name__} was trained without chunk boundaries (dedup=False): "
+                          "tokenize() does not encode chunk by chunk, so the cache is never used.",
+                          RuntimeWarning, stacklevel=3)
+
+    def disable_cache(self):
+        self._cache = None
+
+    def cache_stats(self):
+        # Capacité, taille, hits / misses du cache ; None s'il n'est pas activé
+        return self._cache.stats() if self._cache is not None else None
+
+    def enable_profiling(self, callback=None):
+        """
+        Active les chronomètres par phase (preprocess, split, encode, train...)
+        et les compteurs (morceaux, octets, fusions appliquées, recherches dans
+        le vocabulaire, hits du cache). Sans profiler, les chemins critiques ne
+        font qu'un test `is not None`.
+
+        Args:
+            callback (Callable[[str, object], None] | None): appelé avec
+                (phase, durée) après chaque mesure et ("train_progress", dict)
+                pendant l'entraînement
+        Returns:
+            Profiler
+        """
+        self._profiler = Profiler()
+        if callback is not None:
+            self._profiler.add_callback(callback)
+        return self._profiler
+
+    def disable_profiling(self):
+        self._profiler = None
+
+    def profile_snapshot(self):
+        # Chronomètres, compteurs et mesures dérivées ; None si le profilage est désactivé
+        return self._profiler.snapshot() if self._profiler is not None else None
+
+    def enable_morpho_segmentation(self, lexicon="train.csv", cache_size=100000, separator="-"):
+        """
+        Active l'étape de pré-segmentation morphologique : avant l'entraînement
+        et l'encodage, chaque mot (ou morceau pré-tokenisé pour BPE) est
+        découpé en morphèmes d'après le lexique, et aucune fusion ne traverse
+        une frontière de morphème. Plus besoin de passer par le fichier
+        segmenté de morpho_tokenizer.py.
+
+        L'étape ne fait pas partie du modèle sauvegardé : la réactiver après
+        load_binary / load_from_json pour encoder comme à l'entraînement.
+
+        Args:
+            lexicon: lexique CSV, index .idx ou Mapping mot -> segmentation (voir MorphoSegmenter)
+            cache_size (int): taille du cache LRU des segmentations
+        Returns:
+            MorphoSegmenter
+        """
+        from .morpho import MorphoSegmenter
+        self._morpho = MorphoSegmenter(lexicon, cache_size, separator)
+        return self._morpho
+
+    def disable_morpho_segmentation(self):
+        self._morpho = None
+
+    def _split_morphemes(self, chunks):
+        # Morceaux redécoupés en morphèmes si la pré-segmentation est active
+        if self._morpho is None:
+            return chunks
+        split = self._morpho.split
+        return [piece for chunk in chunks for piece in split(chunk)]
+
+    def _split_morpheme_pieces(self, pieces):
+        # Comme _split_morphemes, sur des couples (position de départ, morceau)
+        if self._morpho is None:
+            return pieces
+        split_pieces = []
+        for start, chunk in pieces:
+            for piece in self._morpho.split(chunk):
+                split_pieces.append((start, piece))
+                start += len(piece)
+        return split_pieces
+
+    def _training_progress(self, total):
+        # Suivi d'entraînement relayé aux callbacks du profiler, s'il est activé
+        prof = self._profiler
+        if prof is None:
+            return None
+        return TrainingProgress(total, lambda info: prof.emit("train_progress", info))
+
+    def _model_signature(self):
+        # Change dès que vocab ou merges sont remplacés ou changent de taille,
+        # ou que la pré-segmentation morphologique change
+        return id(self.vocab), len(self.vocab), id(self.merges), len(self.merges), id(self._morpho)
+
+    def _active_cache(self):
+        cache = self._cache
+        if cache is None:
+            return None
+        signature = self._model_signature()
+        if cache.model_key != signature:
+            cache.clear()
+            cache.model_key = signature
+        return cache
+
+    def _encode_units(self, units, encode_unit):
+        """
+        Encode chaque unité (mot ou morceau pré-tokenisé) avec `encode_unit`,
+        en passant par le cache LRU s'il est activé.
+
+        Returns:
+            list: une séquence de tokens par unité
+        """
+        prof = self._profiler
+        if prof is not None:
+            start = perf_counter()
+        cache = self._active_cache()
+        if cache is None:
+            encoded = [encode_unit(unit) for unit in units]
+        else:
+            if prof is not None:
+                hits, misses = cache.hits, cache.misses
+            encoded = []
+            for unit in units:
+                value = cache.get(unit)
+                if value is None:
+                    value = tuple(encode_unit(unit))
+                    cache.put(unit, value)
+                encoded.append(value)
+            if prof is not None:
+                prof.count("cache_hits", cache.hits - hits)
+                prof.count("cache_misses", cache.misses - misses)
+        if prof is not None:
+            prof.count("chunks", len(encoded))
+            prof.add_time("encode", perf_counter() - start)
+        return encoded
+
+    def get_vocab_trie(self):
+        """
+        Renvoie le trie du vocabulaire, reconstruit si self.vocab a été
+        remplacé ou a changé de taille depuis la dernière construction.
+        """
+        key = (id(self.vocab), len(self.vocab))
+        if self._vocab_trie is None or self._vocab_trie_key != key:
+            self._vocab_trie = CharTrie(self.vocab)
+            self._vocab_trie_key = key
+        return self._vocab_trie
+
+    def token_to_id(self):
+        """
+        Table stable token -> ID des vocabulaires en ensemble de `str` : l'ID
+        est le rang du token dans le vocabulaire trié, comme dans save_binary.
+        Reconstruite si self.vocab a été remplacé ou a changé de taille.
+        """
+        key = (id(self.vocab), len(self.vocab))
+        if self._string_ids is None or self._string_ids_key != key:
+            self._string_ids = {token: i for i, token in enumerate(sorted(self.vocab))}
+            self._string_ids_key = key
+        return self._string_ids
+
+    def _token_sequence(self, text):
+        # Tokens de `text` dans l'ordre, quel que soit le format de tokenize()
+        tokens = self.tokenize(text)
+        if isinstance(tokens, tuple):
+            tokens = tokens[0]
+        if isinstance(tokens, dict):
+            return [token for word_tokens in tokens.values() for token in word_tokens]
+        return tokens
+
+    def unk_token_id(self):
+        """
+        ID des tokens absents d'un vocabulaire de `str` : celui de "[UNK]"
+        s'il existe, sinon un ID réservé juste après le vocabulaire
+        (len(vocab)), que decode_ids() redonne comme "[UNK]".
+        """
+        ids = self.token_to_id()
+        return ids.get("[UNK]", len(ids))
+
+    def encode(self, text):
+        """
+        Encode un texte en IDs entiers.
+
+        Les tokenizers BPE renvoient déjà des IDs ; pour les vocabulaires de
+        `str`, les tokens sont convertis avec token_to_id(), et un token absent
+        du vocabulaire prend l'ID inconnu (voir unk_token_id). Tous les IDs
+        sont donc positifs ou nuls.
+
+        Returns:
+            array: IDs des tokens (`array('i')`)
+        """
+        tokens = self._token_sequence(text)
+        if isinstance(self.vocab, Mapping):
+            return array('i', tokens)
+        ids = self.token_to_id()
+        unk_id = self.unk_token_id()
+        return array('i', [ids.get(token, unk_id) for token in tokens])
+
+    def pad_token_id(self):
+        # ID de "[PAD]" pour un vocabulaire de `str` qui le contient ; None sinon
+        if isinstance(self.vocab, Mapping):
+            return None
+        return self.token_to_id().get("[PAD]")
+
+    def decode_ids(self, ids, attention_mask=None, pad_id=None):
+        """
+        Inverse de encode() : IDs entiers -> texte, via decode() de la sous-classe.
+        Les IDs des vocabulaires de `str` sont d'abord reconvertis en tokens.
+
+        Args:
+            ids: IDs d'une séquence (éventuellement paddée par encode_batch)
+            attention_mask: masque de la séquence ; seuls les IDs à 1 sont décodés
+            pad_id (int | None): sans masque, IDs de padding retirés en fin de
+                séquence (pad_token_id() par défaut)
+        """
+        if attention_mask is not None:
+            ids = [i for i, keep in zip(ids, attention_mask) if keep]
+        else:
+            if pad_id is None:
+                pad_id = self.pad_token_id()
+            if pad_id is not None:
+                end = len(ids)
+                while end and ids[end - 1] == pad_id:
+                    end -= 1
+                ids = ids[:end]
+        if isinstance(self.vocab, Mapping):
+            return self.decode(list(ids))
+        tokens = self.token_to_id()
+        id_to_token = list(tokens)
+        return self.decode([id_to_token[i] if 0 <= i < len(id_to_token) else "[UNK]" for i in ids])
+
+    def encode_batch(self, texts, max_length=None, padding=False, pad_id=None,
+                     use_processes=False, max_workers=None, chunksize=64):
+        """
+        Encode une liste de textes dans un EncodedBatch compact : un seul
+        tampon d'IDs `array('i')` et les offsets de chaque séquence, au lieu
+        d'une liste Python par texte.
+
+        Args:
+            texts (Iterable[str]): textes à encoder
+            max_length (int | None): tronque chaque séquence à cette longueur
+            padding (bool): complète chaque séquence avec pad_id jusqu'à
+                max_length (ou jusqu'à la plus longue séquence du batch) et
+                renvoie un masque d'attention
+            pad_id (int | None): ID de padding ; par défaut celui de "[PAD]"
+                (pad_token_id), obligatoire si le vocabulaire n'en a pas
+            use_processes, max_workers, chunksize: voir batch_tokenize ; par
+                défaut l'encodage est séquentiel
+        Returns:
+            EncodedBatch
+        """
+        if padding and pad_id is None:
+            pad_id = self.pad_token_id()
+            if pad_id is None:
+                raise ValueError("padding=True requires pad_id: the vocabulary has no [PAD] token.")
+        if max_workers or use_processes:
+            sequences = self._map_batch(texts, self.encode, _worker_encode, use_processes, max_workers, chunksize)
+        else:
+            sequences = [self.encode(text) for text in texts]
+        if max_length is not None:
+            sequences = [seq[:max_length] for seq in sequences]
+
+        ids = array('i')
+        offsets = array('q', [0])
+        if not padding:
+            for seq in sequences:
+                ids.extend(seq)
+                offsets.append(len(ids))
+            return EncodedBatch(ids, offsets)
+
+        width = max_length if max_length is not None else max((len(seq) for seq in sequences), default=0)
+        mask = array('b')
+        for seq in sequences:
+            missing = width - len(seq)
+            ids.extend(seq)
+            ids.extend([pad_id] * missing)
+            mask.extend(b"\x01" * len(seq) + bytes(missing))
+            offsets.append(len(ids))
+        return EncodedBatch(ids, offsets, mask)
+
+    def encode_stream(self, texts, batch_size=1000, max_workers=None, chunksize=64):
+        """
+        Encode un flux de documents en mémoire bornée, dans l'ordre.
+
+        Avec max_workers > 1, un seul pool de processus est créé pour tout le
+        flux (modèle transmis une fois par worker) ; les lots de batch_size
+        documents sont soumis en double tampon : le lot suivant est encodé
+        pendant que l'appelant consomme le lot courant.
+
+        Args:
+            texts (Iterable[str]): documents
+            batch_size (int): nombre de documents par lot
+            max_workers (int | None): nombre de processus (séquentiel si None ou 1)
+        Yields:
+            array: IDs de chaque document (voir encode)
+        """
+        if not max_workers or max_workers <= 1:
+            for text in texts:
+                yield self.encode(text)
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(self,)) as executor:
+            pending = None
+            for batch in _batched(texts, batch_size):
+                submitted = executor.map(_worker_encode, batch, chunksize=chunksize)
+                if pending is not None:
+                    yield from pending
+                pending = submitted
+            if pending is not None:
+                yield from pending
+
+    def tokenize_stream(self, lines, chunk_chars=1 << 16):
+        """
+        Tokenise un flux de texte par morceaux, en mémoire bornée.
+
+        Les lignes sont accumulées jusqu'à `chunk_chars` caractères, puis le
+        tampon est coupé à une frontière sûre (début du dernier morceau du
+        motif de découpage de tokenize(), voir _split_pattern, sinon après le
+        dernier blanc) ; le reste est reporté sur le morceau suivant. Les lignes `bytes` sont décodées de
+        façon incrémentale, un caractère UTF-8 multi-octets coupé entre deux
+        lignes n'est donc jamais corrompu.
+
+        Pour un BPE entraîné à plat (sans dedup ni pré-segmentation
+        morphologique), les fusions traversent les frontières de morceaux :
+        le résultat peut alors différer de tokenize() sur le texte entier
+        autour des coupures.
+
+        Args:
+            lines (Iterable[str | bytes]): lignes ou blocs de texte
+            chunk_chars (int): taille cible d'un morceau en caractères
+        Yields:
+            résultat de tokenize() pour chaque morceau
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        buffer = []
+        size = 0
+        for line in lines:
+            if isinstance(line, bytes):
+                line = decoder.decode(line)
+            buffer.append(line)
+            size += len(line)
+            if size < chunk_chars:
+                continue
+            text = "".join(buffer)
+            cut = self._stream_split_point(text)
+            if cut == 0:
+                if len(text) < 4 * chunk_chars:
+                    # Pas de frontière sûre : on continue d'accumuler
+                    buffer = [text]
+                    continue
+                cut = chunk_chars
+            yield self.tokenize(text[:cut])
+            buffer = [text[cut:]]
+            size = len(buffer[0])
+
+        text = "".join(buffer) + decoder.decode(b"", final=True)
+        if text:
+            yield self.tokenize(text)
+
+    def _split_pattern(self):
+        # Motif regex qui découpe le texte en morceaux dans tokenize() (None si aucun)
+        return getattr(self, "pattern", None)
+
+    def _stream_split_point(self, text):
+        # Dernière position où l'on peut couper le texte sans changer le découpage
+        pattern = self._split_pattern()
+        if pattern:
+            last_start = 0
+            for match in re.finditer(pattern, text):
+                last_start = match.start()
+            return last_start
+        for i in range(len(text) - 1, -1, -1):
+            if text[i].isspace():
+                return i + 1
+        return 0
+
+    def tokenize_file(self, path, block_size=1 << 20):
+        """
+        Tokenise un fichier UTF-8 bloc par bloc (voir tokenize_stream).
+
+        Args:
+            path (str): chemin du fichier
+            block_size (int): taille des blocs lus, en octets
+        Yields:
+            résultat de tokenize() pour chaque morceau
+        """
+        with open(path, "rb") as f:
+            yield from self.tokenize_stream(iter(lambda: f.read(block_size), b""), chunk_chars=block_size)
+
+    def tokenize_file_to_binary(self, path, output, typecode="I", block_size=1 << 20):
+        """
+        Écrit les IDs de tokens d'un fichier dans un fichier binaire brut
+        (tableau `array(typecode)` contigu, uint32 par défaut), en mémoire bornée.
+        Réservé aux tokenizers dont tokenize() renvoie une liste d'entiers.
+
+        Args:
+            path (str): fichier texte d'entrée
+            output (str | file): chemin ou fichier binaire ouvert en écriture
+            typecode (str): type des éléments du tableau (voir le module array)
+        Returns:
+            int: nombre de tokens écrits
+        """
+        count = 0
+        out = output if hasattr(output, "write") else open(output, "wb")
+        try:
+            for ids in self.tokenize_file(path, block_size):
+                out.write(array(typecode, ids).tobytes())
+                count += len(ids)
+        finally:
+            if out is not output:
+                out.close()
+        return count
+
     def get_token_stats(self, tokenized_text):
         # Statistiques sur le nombre total et unique de tokens
         num_tokens = sum(len(tokens) for tokens in tokenized_text.values())
@@ -61,12 +532,40 @@ class BaseTokenizer:
 
     def preprocess_text(self, text, lowercase=True, remove_punctuation=False):
         # Prétraitement basique du texte : passage en minuscule, suppression de la ponctuation
+        prof = self._profiler
+        if prof is not None:
+            start = perf_counter()
         if lowercase:
             text = text.lower()
         if remove_punctuation:
             text = re.sub(r'[^\w\s]', '', text)
+        if prof is not None:
+            prof.add_time("preprocess", perf_counter() - start)
         return text
 
+    def preprocess_text_with_offsets(self, text, lowercase=True, remove_punctuation=False):
+        """
+        Même prétraitement que preprocess_text, en gardant pour chaque
+        caractère du résultat l'indice du caractère d'origine.
+
+        Returns:
+            tuple: (texte prétraité, array('i') position d'origine par caractère)
+        """
+        char_map = array('i', range(len(text)))
+        if lowercase:
+            lowered = text.lower()
+            if len(lowered) != len(text):
+                # Certains caractères s'allongent en minuscule (ex. "İ" -> "i̇")
+                char_map = array('i')
+                for i, ch in enumerate(text):
+                    char_map.extend([i] * len(ch.lower()))
+            text = lowered
+        if remove_punctuation:
+            kept = [match.span() for match in re.finditer(r'[\w\s]+', text)]
+            char_map = array('i', [char_map[i] for start, end in kept for i in range(start, end)])
+            text = "".join(text[start:end] for start, end in kept)
+        return text, char_map
+
     def save_as_json(self, filename):
         """
         Sauvegarde le vocabulaire et les règles de merge dans un fichier JSON.
@@ -93,17 +592,69 @@ class BaseTokenizer:
             self.vocab = set(data.get("vocab", []))
             self.merges = data.get("merges", {})
 
-    def benchmark_tokenization(self, corpus):
-        # Mesure du temps d'exécution pour la tokenisation d'un corpus
-        start_time = time.time()
-        self.tokenize(corpus)
-        end_time = time.time()
-        elapsed_time = end_time - start_time
-        print(f"Tokenization took {elapsed_time:.4f} seconds.")
-        return elapsed_time
+    def save_binary(self, filename):
+        """
+        Sauvegarde le modèle au format binaire compact (voir binary_model) :
+        blob d'octets des tokens, table d'offsets, table des fusions par rang
+        et index de recherche précalculé.
+
+        Args:
+            filename (str): chemin du fichier de sortie
+        """
+        dump_tokenizer(self, filename)
+
+    def load_binary(self, filename, materialize=False):
+        """
+        Charge un modèle binaire par mmap : pas d'analyse du fichier, et les
+        pages sont partagées entre tous les processus qui chargent le même modèle.
+
+        Args:
+            filename (str): chemin du fichier à lire
+            materialize (bool): copie vocabulaire et fusions dans des dict Python
+                (chargement plus lent, encodage plus rapide)
+        """
+        load_tokenizer_into(self, filename, materialize)
+
+    def _binary_attrs(self):
+        # Attributs de configuration sauvegardés avec le modèle binaire :
+        # attributs publics scalaires, plus le motif regex éventuel
+        attrs = {}
+        for name, value in vars(self).items():
+            if name.startswith("_") or name in ("vocab", "merges"):
+                continue
+            if name == "pattern":
+                attrs[name] = value.pattern if value is not None else None
+            elif value is None or isinstance(value, (bool, int, float, str)):
+                attrs[name] = value
+        return attrs
+
+    def _apply_binary_attrs(self, attrs):
+        for name, value in attrs.items():
+            if name == "pattern" and value is not None:
+                value = re.compile(value)
+            setattr(self, name, value)
+
+    def benchmark_tokenization(self, corpus, warmup=1, repeat=3):
+        """
+        Mesure l'encodage de `corpus`, une ligne non vide par document, avec
+        le banc d'essai de benchmark.py (perf_counter, échauffement, répétitions).
+
+        Returns:
+            dict: débit (octets/s, tokens/s), latences p50/p99, pic mémoire,
+                taux de compression
+        """
+        from .benchmark import measure_encoding
+        docs = [line for line in corpus.splitlines() if line.strip()] or [corpus]
+        result = measure_encoding(self.encode, docs, warmup, repeat)
+        print(f"Tokenization: {result['bytes_per_s'] / 1e6:.2f} MB/s, {result['tokens_per_s']:.0f} tokens/s, "
+              f"p50 {result['p50_latency_s'] * 1000:.3f} ms, p99 {result['p99_latency_s'] * 1000:.3f} ms, "
+              f"peak {result['peak_memory_bytes'] / 1024:.0f} KiB")
+        return result
 
     def visualize_subword_frequency(self, subwords):
         # Affiche un graphique de fréquence des sous-mots
+        # Import différé : matplotlib coûte plusieurs centaines de ms au démarrage
+        import matplotlib.pyplot as plt
         subword_freq = Counter(subwords)
         plt.bar(subword_freq.keys(), subword_freq.values())
         plt.xlabel('Sous-mots')
@@ -112,8 +663,59 @@ class BaseTokenizer:
         plt.xticks(rotation=90)
         plt.show()
 
-    def batch_tokenize(self, texts):
-        # Tokenisation d'une liste de textes en parallèle (multithreading)
-        with ThreadPoolExecutor() as executor:
-            results = list(executor.map(self.tokenize, texts))
+    def batch_tokenize(self, texts, use_processes=False, max_workers=None, chunksize=64):
+        """
+        Tokenise une liste de textes en parallèle ; l'ordre des résultats est conservé.
+
+        Args:
+            texts (Iterable[str]): textes à tokeniser
+            use_processes (bool): utilise un pool de processus (contourne le GIL) ;
+                le modèle est transmis une seule fois à chaque worker via l'initializer
+            max_workers (int | None): nombre de workers (os.cpu_count() par défaut)
+            chunksize (int): nombre de textes envoyés à un worker par tâche (mode processus)
+        Returns:
+            list: résultat de tokenize() pour chaque texte
+        """
+        return self._map_batch(texts, self.tokenize, _worker_tokenize, use_processes, max_workers, chunksize)
+
+    def _map_batch(self, texts, method, worker_fn, use_processes, max_workers, chunksize):
+        # Import différé : concurrent.futures.process charge multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        if not use_processes:
+            # Tokenisation en parallèle (multithreading)
+            with ThreadPoolExecutor(max_workers) as executor:
+                results = list(executor.map(method, texts))
+            return results
+
+        with ProcessPoolExecutor(max_workers or os.cpu_count(), initializer=_init_worker,
+                                 initargs=(self,)) as executor:
+            results = list(executor.map(worker_fn, texts, chunksize=chunksize))
         return results
+
+
+# Tokenizer propre à chaque processus worker, installé une seule fois par _init_worker
+_worker_tokenizer = None
+
+
+def _init_worker(tokenizer):
+    global _worker_tokenizer
+    _worker_tokenizer = tokenizer
+
+
+def _worker_tokenize(text):
+    return _worker_tokenizer.tokenize(text)
+
+
+def _worker_encode(text):
+    return _worker_tokenizer.encode(text)
+
+
+def _batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,70 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+if not __package__:
+    # Exécution directe (python tokenization/bench_kernels.py) : rend le package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tokenization import numpy_kernel
+from tokenization.bpe_trainer import IncrementalBpeTrainer
+from tokenization.naive_bpe import merge, stats
+
+
+def list_train(words, num_merges):
+    # Boucle de référence : stats() + merge() sur des listes Python à chaque fusion
+    ids = []
+    for word in words:
+        ids.extend(word)
+    merges = {}
+    for i in range(num_merges):
+        counts = stats(ids)
+        if not counts:
+            break
+        pair = max(counts, key=counts.get)
+        ids = merge(ids, pair, 256 + i)
+        merges[pair] = 256 + i
+    return merges
+
+
+def make_corpus(num_bytes, seed=0):
+    rng = random.Random(seed)
+    syllables = ["ka", "ri", "to", "mu", "sel", "an", "or", "ve", "li", "nes"]
+    words = []
+    size = 0
+    while size < num_bytes:
+        words.append("".join(rng.choice(syllables) for _ in range(rng.randint(1, 4))))
+        size += len(words[-1]) + 1
+    return list(" ".join(words).encode("utf-8"))
+
+
+def run(num_bytes, num_merges, repeat):
+    ids = make_corpus(num_bytes)
+    engines = (
+        ("listes", lambda: list_train([ids], num_merges)),
+        ("numpy", lambda: numpy_kernel.train([ids], None, num_merges)),
+        ("incrémental", lambda: IncrementalBpeTrainer([ids]).train(num_merges)),
+    )
+    results = {}
+    for name, fn in engines:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results[name] = fn()
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:>12} | {num_bytes:>8} octets, {num_merges} fusions : {best * 1000:9.1f} ms")
+
+    # Les trois moteurs départagent les égalités de la même façon
+    assert results["listes"] == results["numpy"] == results["incrémental"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmark : stats/merge en listes vs noyau NumPy vs moteur incrémental")
+    parser.add_argument("--num_merges", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    for num_bytes in (10_000, 100_000, 500_000):
+        run(num_bytes, args.num_merges, args.repeat)
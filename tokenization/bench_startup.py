@@ -0,0 +1,45 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Temps de démarrage : interpréteur nu, import de chaque module du package,
+# et `tokenizer_cli --help`, mesurés dans des processus neufs.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ["tokenization", "tokenization.base_tokenizer", "tokenization.naive_bpe",
+           "tokenization.dynamic_bpe", "tokenization.unigram_bpe", "tokenization.worpiece_tokenizer"]
+
+
+def time_command(args, runs):
+    # Médiane du temps réel (ms) de `runs` exécutions, après une exécution de chauffe (.pyc)
+    subprocess.run(args, cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du temps de démarrage (imports, CLI)")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max_overhead_ms", type=float, default=None,
+                        help="Échoue si tokenizer_cli dépasse l'interpréteur nu de plus de N ms")
+    args = parser.parse_args()
+
+    baseline = time_command([sys.executable, "-c", "pass"], args.runs)
+    print(f"{'python -c pass':>40} : {baseline:7.1f} ms")
+    for module in MODULES:
+        elapsed = time_command([sys.executable, "-c", f"import {module}"], args.runs)
+        print(f"{'import ' + module:>40} : {elapsed:7.1f} ms (+{elapsed - baseline:.1f})")
+    cli = time_command([sys.executable, "-m", "tokenization.tokenizer_cli", "--help"], args.runs)
+    overhead = cli - baseline
+    print(f"{'tokenizer_cli --help':>40} : {cli:7.1f} ms (+{overhead:.1f})")
+
+    if args.max_overhead_ms is not None and overhead > args.max_overhead_ms:
+        sys.exit(f"tokenizer_cli startup overhead {overhead:.1f} ms exceeds {args.max_overhead_ms} ms")
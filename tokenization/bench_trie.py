@@ -0,0 +1,78 @@
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+if not __package__:
+    # Exécution directe (python tokenization/bench_trie.py) : rend le package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tokenization.char_trie import CharTrie
+
+
+def set_longest_match(vocab, word):
+    # Ancienne méthode : on teste toutes les sous-chaînes word[i:j] dans un set
+    tokens = []
+    i = 0
+    while i < len(word):
+        for j in range(len(word), i, -1):
+            if word[i:j] in vocab:
+                tokens.append(word[i:j])
+                i = j
+                break
+        else:
+            tokens.append(word[i])
+            i += 1
+    return tokens
+
+
+def trie_longest_match(trie, word):
+    tokens = []
+    i = 0
+    while i < len(word):
+        j = trie.longest_match(word, i)
+        if j == i:
+            j = i + 1
+        tokens.append(word[i:j])
+        i = j
+    return tokens
+
+
+def make_vocab(size, max_len, seed=0):
+    rng = random.Random(seed)
+    vocab = set(string.ascii_lowercase)
+    while len(vocab) < size:
+        length = rng.randint(2, max_len)
+        vocab.add("".join(rng.choice(string.ascii_lowercase[:8]) for _ in range(length)))
+    return vocab
+
+
+def run(vocab_size, word_len, num_words, repeat):
+    vocab = make_vocab(vocab_size, max_len=12)
+    rng = random.Random(1)
+    words = ["".join(rng.choice(string.ascii_lowercase[:8]) for _ in range(word_len)) for _ in range(num_words)]
+    trie = CharTrie(vocab)
+
+    for name, fn, model in (("set", set_longest_match, vocab), ("trie", trie_longest_match, trie)):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for word in words:
+                fn(model, word)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:>5} | mots de {word_len:>4} car. : {best * 1000:8.2f} ms")
+
+    assert all(set_longest_match(vocab, w) == trie_longest_match(trie, w) for w in words)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmark : plus long match par set vs CharTrie")
+    parser.add_argument("--vocab_size", type=int, default=20000)
+    parser.add_argument("--num_words", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for word_len in (16, 64, 256, 1024):
+        run(args.vocab_size, word_len, args.num_words, args.repeat)
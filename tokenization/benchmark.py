@@ -0,0 +1,270 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+# Racine du dépôt : wordpiece.py et le package tokenization (WordPieceTokenizer)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+# Banc d'essai des tokenizers : entraînement et encodage mesurés séparément
+# (perf_counter, passes d'échauffement, répétitions), débit, latence par
+# document, pic mémoire (tracemalloc) et taux de compression, sur des corpus
+# synthétiques de taille croissante. Les résultats sont écrits en JSON pour
+# être comparés d'une version à l'autre (voir compare_results).
+
+SYLLABLES = ["ka", "ri", "to", "mu", "sel", "an", "or", "ve", "li", "nes",
+             "qu", "é", "ent", "ion", "tr", "ä", "ß", "ch", "ou", "ei"]
+PUNCTUATION = [".", ",", "!", "?", ";", ":"]
+
+
+def make_corpus(num_docs, seed=0, vocab_words=2000):
+    """
+    Corpus synthétique : mots tirés selon une loi de Zipf dans un lexique
+    de syllabes (quelques caractères accentués), ponctuation, documents de
+    longueurs variables.
+
+    Returns:
+        List[str]: documents
+    """
+    rng = random.Random(seed)
+    lexicon = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))) for _ in range(vocab_words)]
+    weights = [1 / (rank + 1) for rank in range(vocab_words)]
+    docs = []
+    for _ in range(num_docs):
+        words = rng.choices(lexicon, weights, k=rng.randint(10, 120))
+        for i in range(len(words)):
+            if rng.random() < 0.08:
+                words[i] += rng.choice(PUNCTUATION)
+        docs.append(" ".join(words).capitalize())
+    return docs
+
+
+def percentile(sorted_values, q):
+    # Rang le plus proche ; sorted_values doit être trié
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def peak_memory(fn):
+    """Pic d'allocation (octets, tracemalloc) pendant fn()."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure_training(make_tokenizer, train, repeat=1, trace_memory=True):
+    """
+    Entraîne `repeat` tokenizers neufs et chronomètre chaque entraînement ;
+    une passe supplémentaire sous tracemalloc mesure le pic mémoire.
+
+    Returns:
+        tuple: (dernier tokenizer entraîné, dict des mesures)
+    """
+    times = []
+    tokenizer = None
+    for _ in range(repeat):
+        tokenizer = make_tokenizer()
+        start = time.perf_counter()
+        train(tokenizer)
+        times.append(time.perf_counter() - start)
+    result = {"repeat": repeat, "best_s": min(times), "mean_s": sum(times) / len(times)}
+    if trace_memory:
+        result["peak_memory_bytes"] = peak_memory(lambda: train(make_tokenizer()))
+    return tokenizer, result
+
+
+def measure_encoding(encode, docs, warmup=1, repeat=3, trace_memory=True):
+    """
+    Mesure l'encodage document par document.
+
+    Args:
+        encode (Callable[[str], Sized]): encode un document, renvoie ses tokens
+        docs (List[str]): documents
+        warmup (int): passes non chronométrées sur le corpus
+        repeat (int): passes chronométrées
+    Returns:
+        dict: débit (octets/s, tokens/s), latences p50/p99 par document,
+            pic mémoire et taux de compression (octets UTF-8 par token)
+    """
+    for _ in range(warmup):
+        for doc in docs:
+            encode(doc)
+
+    num_bytes = sum(len(doc.encode("utf-8")) for doc in docs)
+    num_tokens = 0
+    latencies = []
+    pass_times = []
+    for _ in range(repeat):
+        num_tokens = 0
+        pass_start = time.perf_counter()
+        for doc in docs:
+            start = time.perf_counter()
+            tokens = encode(doc)
+            latencies.append(time.perf_counter() - start)
+            num_tokens += len(tokens)
+        pass_times.append(time.perf_counter() - pass_start)
+
+    best = min(pass_times)
+    latencies.sort()
+    result = {
+        "warmup": warmup,
+        "repeat": repeat,
+        "best_s": best,
+        "bytes_per_s": num_bytes / best if best else 0.0,
+        "tokens_per_s": num_tokens / best if best else 0.0,
+        "p50_latency_s": percentile(latencies, 50),
+        "p99_latency_s": percentile(latencies, 99),
+        "num_tokens": num_tokens,
+        "compression_ratio": num_bytes / num_tokens if num_tokens else 0.0,
+    }
+    if trace_memory:
+        result["peak_memory_bytes"] = peak_memory(lambda: [encode(doc) for doc in docs])
+    return result
+
+
+def _naive_bpe():
+    from tokenization.naive_bpe import NaiveBpe
+    return NaiveBpe()
+
+
+def _dynamic_bpe():
+    from tokenization.dynamic_bpe import DynamicBpe
+    return DynamicBpe()
+
+
+def _unigram():
+    from tokenization.unigram_bpe import UnigramBPETokenizer
+    return UnigramBPETokenizer(vocab_size=300)
+
+
+def _wordpiece():
+    from tokenization.worpiece_tokenizer import WordPieceTokenizer
+    return WordPieceTokenizer(vocab_size=500)
+
+
+def _wordpiece_builder():
+    from wordpiece import WordPieceVocabBuilder
+    return WordPieceVocabBuilder(vocab_size=500, verbose=False)
+
+
+# nom -> (fabrique, entraînement(tokenizer, docs), encodage disponible)
+TOKENIZERS = {
+    "naive_bpe": (_naive_bpe, lambda t, docs: t.train("\n".join(docs), 512), True),
+    "dynamic_bpe": (_dynamic_bpe, lambda t, docs: t.train("\n".join(docs), 512), True),
+    "unigram": (_unigram, lambda t, docs: t.train("\n".join(docs)), True),
+    "wordpiece": (_wordpiece, lambda t, docs: t.train(docs), True),
+    # wordpiece.py ne construit qu'un vocabulaire : entraînement seulement
+    "wordpiece_builder": (_wordpiece_builder, lambda t, docs: t.build_vocab(docs), False),
+}
+
+
+def run_benchmarks(names, sizes, warmup=1, repeat=3, train_repeat=1, trace_memory=True, seed=0):
+    """
+    Entraîne puis encode chaque tokenizer sur des corpus synthétiques de
+    `sizes` documents.
+
+    Returns:
+        dict: métadonnées de l'exécution et liste des résultats
+    """
+    results = []
+    for num_docs in sizes:
+        docs = make_corpus(num_docs, seed)
+        corpus_bytes = sum(len(doc.encode("utf-8")) for doc in docs)
+        for name in names:
+            make_tokenizer, train, can_encode = TOKENIZERS[name]
+            tokenizer, train_result = measure_training(make_tokenizer, lambda t: train(t, docs),
+                                                       train_repeat, trace_memory)
+            entry = {"tokenizer": name, "num_docs": num_docs, "corpus_bytes": corpus_bytes,
+                     "train": train_result, "encode": None}
+            if can_encode:
+                entry["encode"] = measure_encoding(tokenizer.encode, docs, warmup, repeat, trace_memory)
+            results.append(entry)
+            print(_format_entry(entry))
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "warmup": warmup,
+            "repeat": repeat,
+            "train_repeat": train_repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def _format_entry(entry):
+    line = f"{entry['tokenizer']:>18} | {entry['num_docs']:>6} docs | train {entry['train']['best_s'] * 1000:9.1f} ms"
+    encode = entry["encode"]
+    if encode:
+        line += (f" | encode {encode['bytes_per_s'] / 1e6:6.2f} Mo/s {encode['tokens_per_s'] / 1e3:8.1f} ktok/s"
+                 f" | p50 {encode['p50_latency_s'] * 1e6:8.1f} µs p99 {encode['p99_latency_s'] * 1e6:8.1f} µs"
+                 f" | {encode['compression_ratio']:.2f} o/tok")
+    return line
+
+
+def compare_results(old, new, threshold=0.10):
+    """
+    Compare deux exécutions (dicts JSON de run_benchmarks) et renvoie les
+    régressions : temps d'entraînement ou débit d'encodage dégradés de plus
+    de `threshold`.
+
+    Returns:
+        List[str]: une ligne par régression
+    """
+    previous = {(e["tokenizer"], e["num_docs"]): e for e in old["results"]}
+    regressions = []
+    for entry in new["results"]:
+        before = previous.get((entry["tokenizer"], entry["num_docs"]))
+        if before is None:
+            continue
+        label = f"{entry['tokenizer']} ({entry['num_docs']} docs)"
+        slowdown = entry["train"]["best_s"] / before["train"]["best_s"] - 1
+        if slowdown > threshold:
+            regressions.append(f"{label}: train {slowdown:+.0%}")
+        if entry["encode"] and before["encode"]:
+            drop = 1 - entry["encode"]["bytes_per_s"] / before["encode"]["bytes_per_s"]
+            if drop > threshold:
+                regressions.append(f"{label}: encode throughput -{drop:.0%}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark d'entraînement et d'encodage des tokenizers")
+    parser.add_argument("--tokenizers", nargs="+", choices=sorted(TOKENIZERS), default=list(TOKENIZERS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[50, 200, 800], help="Nombre de documents par corpus")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--train_repeat", type=int, default=1)
+    parser.add_argument("--no_memory", action="store_true", help="Ne mesure pas le pic mémoire (tracemalloc)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Fichier JSON des résultats")
+    parser.add_argument("--baseline", help="Résultats JSON précédents : signale les régressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Seuil de régression (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.tokenizers, args.sizes, args.warmup, args.repeat,
+                            args.train_repeat, not args.no_memory, args.seed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_results(json.load(f), report, args.threshold)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            sys.exit(1)
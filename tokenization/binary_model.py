@@ -0,0 +1,340 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import zlib
+from array import array
+from collections.abc import Mapping
+
+# Format binaire versionné d'un modèle de tokenizer :
+#
+#   en-tête  : magic (4s) | version (H) | réservé (H) | taille des métadonnées (I)
+#   méta     : JSON UTF-8 (classe, attributs scalaires, table des sections)
+#   sections : tableaux contigus alignés sur 8 octets, lus directement par mmap
+#       offsets      'I'  début de chaque token dans blob (V + 1 valeurs)
+#       blob         'B'  octets de tous les tokens, concaténés dans l'ordre des IDs
+#       token_slots  'I'  table de hachage (crc32, sondage linéaire) octets -> ID + 1
+#       merge_left   'i'  \
+#       merge_right  'i'   | fusions (gauche, droite) -> nouvel ID, dans l'ordre des rangs
+#       merge_new    'i'  /
+#       merge_slots  'I'  table de hachage paire -> indice de fusion + 1
+#       scores       'd'  log-probabilités par token (optionnel, Unigram)
+
+MAGIC = b"TKLB"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sHHI")
+_ALIGN = 8
+
+
+def _align(n):
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _table_size(n):
+    size = 8
+    while size < 2 * n:
+        size *= 2
+    return size
+
+
+def _pair_hash(a, b):
+    return (a * 0x9E3779B1) ^ b
+
+
+def _build_slots(keys, hash_fn):
+    slots = array('I', bytes(4 * _table_size(len(keys))))
+    mask = len(slots) - 1
+    for idx, key in enumerate(keys):
+        h = hash_fn(key) & mask
+        while slots[h]:
+            h = (h + 1) & mask
+        slots[h] = idx + 1
+    return slots
+
+
+def save_model(path, tokens, merges=(), scores=None, meta=None):
+    """
+    Écrit un modèle au format binaire.
+
+    Args:
+        path (str): fichier de sortie
+        tokens (List[bytes]): octets de chaque token, l'indice étant l'ID
+        merges (Iterable[Tuple[int, int, int]]): fusions (gauche, droite, nouvel ID) par rang
+        scores (List[float] | None): score de chaque token
+        meta (dict): métadonnées JSON (classe, attributs...)
+    """
+    merges = list(merges)
+    offsets = array('I', [0])
+    for token in tokens:
+        offsets.append(offsets[-1] + len(token))
+
+    sections = [
+        ("offsets", offsets),
+        ("blob", array('B', b"".join(tokens))),
+        ("token_slots", _build_slots(tokens, zlib.crc32)),
+        ("merge_left", array('i', [m[0] for m in merges])),
+        ("merge_right", array('i', [m[1] for m in merges])),
+        ("merge_new", array('i', [m[2] for m in merges])),
+        ("merge_slots", _build_slots([(m[0], m[1]) for m in merges], lambda p: _pair_hash(*p))),
+    ]
+    if scores is not None:
+        sections.append(("scores", array('d', scores)))
+    write_sections(path, sections, dict(meta or {}, num_tokens=len(tokens), num_merges=len(merges)))
+
+
+class FileSection:
+    """
+    Section de write_sections dont le contenu brut est dans un fichier
+    (construit en flux) : recopiée par blocs, sans être chargée en mémoire.
+    """
+
+    def __init__(self, path, typecode):
+        self.path = path
+        self.typecode = typecode
+        self.itemsize = array(typecode).itemsize
+
+    def __len__(self):
+        return os.path.getsize(self.path) // self.itemsize
+
+    def write_to(self, f):
+        with open(self.path, "rb") as src:
+            shutil.copyfileobj(src, f, 1 << 20)
+
+
+def write_sections(path, sections, meta):
+    """
+    Écrit l'en-tête, les métadonnées JSON et des sections array alignées
+    (format commun aux modèles et aux points de reprise d'entraînement).
+
+    Args:
+        sections (List[Tuple[str, array | FileSection]]): (nom, tableau), dans l'ordre du fichier
+    """
+    table = {}
+    position = 0
+    for name, data in sections:
+        table[name] = [position, len(data), data.typecode]
+        position = _align(position + len(data) * data.itemsize)
+
+    meta = dict(meta, byteorder=sys.byteorder, sections=table)
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    data_start = _align(_HEADER.size + len(meta_bytes))
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(meta_bytes)))
+        f.write(meta_bytes)
+        f.write(bytes(data_start - f.tell()))
+        for name, data in sections:
+            f.write(bytes(data_start + table[name][0] - f.tell()))
+            if isinstance(data, FileSection):
+                data.write_to(f)
+            else:
+                f.write(data.tobytes())
+
+
+class BinaryModel:
+    """
+    Modèle binaire ouvert par mmap : aucune section n'est copiée ni analysée,
+    les pages sont partagées entre tous les processus qui ouvrent le fichier.
+    Se sérialise (pickle) par son chemin : chaque worker rouvre le fichier.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, meta_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a binary tokenizer model: {path}")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Unsupported model format version {version} (max {FORMAT_VERSION})")
+        self.meta = json.loads(self._mm[_HEADER.size:_HEADER.size + meta_len].decode("utf-8"))
+        if self.meta["byteorder"] != sys.byteorder:
+            raise ValueError("Model was written on a machine with a different byte order.")
+        self._data_start = _align(_HEADER.size + meta_len)
+        self._view = memoryview(self._mm)
+
+    def __reduce__(self):
+        return self.__class__, (self.path,)
+
+    def close(self):
+        # Les vues renvoyées par section() doivent avoir été libérées
+        self._view.release()
+        self._mm.close()
+
+    def has_section(self, name):
+        return name in self.meta["sections"]
+
+    def section(self, name):
+        offset, count, typecode = self.meta["sections"][name]
+        start = self._data_start + offset
+        itemsize = array(typecode).itemsize
+        return self._view[start:start + count * itemsize].cast(typecode)
+
+
+class MappedBytesVocab(Mapping):
+    """Vocabulaire ID -> bytes lu directement dans le modèle mmappé."""
+
+    def __init__(self, model):
+        self.model = model
+        self._offsets = model.section("offsets")
+        self._blob = model.section("blob")
+        self._slots = model.section("token_slots")
+        self._size = len(self._offsets) - 1
+
+    def __reduce__(self):
+        return self.__class__, (self.model,)
+
+    def __getitem__(self, token_id):
+        if not 0 <= token_id < self._size:
+            raise KeyError(token_id)
+        return bytes(self._blob[self._offsets[token_id]:self._offsets[token_id + 1]])
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return iter(range(self._size))
+
+    def get_id(self, token_bytes):
+        """ID du token de ces octets (recherche dans la table de hachage), ou None."""
+        slots = self._slots
+        mask = len(slots) - 1
+        h = zlib.crc32(token_bytes) & mask
+        while slots[h]:
+            idx = slots[h] - 1
+            if self._blob[self._offsets[idx]:self._offsets[idx + 1]] == token_bytes:
+                return idx
+            h = (h + 1) & mask
+        return None
+
+
+class MappedStrVocab:
+    """Ensemble de tokens `str` lu dans le modèle mmappé (appartenance par hachage)."""
+
+    def __init__(self, model):
+        self._bytes = MappedBytesVocab(model)
+        self.model = model
+
+    def __reduce__(self):
+        return self.__class__, (self.model,)
+
+    def __contains__(self, token):
+        return isinstance(token, str) and self._bytes.get_id(token.encode("utf-8")) is not None
+
+    def __len__(self):
+        return len(self._bytes)
+
+    def __iter__(self):
+        for token_id in range(len(self._bytes)):
+            yield self._bytes[token_id].decode("utf-8")
+
+
+class MappedMerges(Mapping):
+    """Table des fusions (gauche, droite) -> nouvel ID lue dans le modèle mmappé."""
+
+    def __init__(self, model):
+        self.model = model
+        self._left = model.section("merge_left")
+        self._right = model.section("merge_right")
+        self._new = model.section("merge_new")
+        self._slots = model.section("merge_slots")
+
+    def __reduce__(self):
+        return self.__class__, (self.model,)
+
+    def get(self, pair, default=None):
+        slots = self._slots
+        mask = len(slots) - 1
+        a, b = pair
+        h = _pair_hash(a, b) & mask
+        while slots[h]:
+            idx = slots[h] - 1
+            if self._left[idx] == a and self._right[idx] == b:
+                return self._new[idx]
+            h = (h + 1) & mask
+        return default
+
+    def __getitem__(self, pair):
+        value = self.get(pair)
+        if value is None:
+            raise KeyError(pair)
+        return value
+
+    def __contains__(self, pair):
+        return self.get(pair) is not None
+
+    def __len__(self):
+        return len(self._new)
+
+    def __iter__(self):
+        for idx in range(len(self._new)):
+            yield self._left[idx], self._right[idx]
+
+
+def dump_tokenizer(tokenizer, path):
+    """
+    Sauvegarde un tokenizer : vocabulaire ID -> bytes (BPE) ou ensemble de
+    `str` (WordPiece, Unigram, glouton), fusions, log-probabilités éventuelles.
+    """
+    vocab = tokenizer.vocab
+    meta = {"class": type(tokenizer).__name__, "attrs": tokenizer._binary_attrs()}
+    scores = None
+
+    if isinstance(vocab, Mapping):
+        meta["token_type"] = "bytes"
+        if sorted(vocab) != list(range(len(vocab))):
+            raise ValueError("Binary format requires contiguous token ids starting at 0.")
+        tokens = [vocab[i] for i in range(len(vocab))]
+        merges = [(a, b, new) for (a, b), new in tokenizer.merges.items()]
+    else:
+        meta["token_type"] = "str"
+        strings = sorted(vocab)
+        index = {token: i for i, token in enumerate(strings)}
+        tokens = [token.encode("utf-8") for token in strings]
+        try:
+            merges = [(index[a], index[b], index[new]) for (a, b), new in tokenizer.merges.items()]
+        except KeyError as e:
+            raise ValueError(f"Merge refers to a token missing from the vocabulary: {e}")
+        log_probs = getattr(tokenizer, "log_probs", None)
+        if log_probs:
+            scores = [log_probs.get(token, float("-inf")) for token in strings]
+
+    save_model(path, tokens, merges, scores, meta)
+
+
+def load_tokenizer_into(tokenizer, path, materialize=False):
+    """
+    Charge un modèle binaire dans `tokenizer`.
+
+    Sans `materialize`, le vocabulaire et les fusions BPE restent dans le
+    fichier mmappé (chargement quasi instantané, mémoire partagée entre
+    processus) ; avec `materialize`, ils sont copiés dans des dict Python
+    (chargement en O(V), recherches plus rapides).
+    """
+    model = BinaryModel(path)
+    if model.meta["class"] != type(tokenizer).__name__:
+        raise ValueError(f"Model was saved by {model.meta['class']}, not {type(tokenizer).__name__}.")
+    tokenizer._apply_binary_attrs(model.meta["attrs"])
+
+    if model.meta["token_type"] == "bytes":
+        vocab, merges = MappedBytesVocab(model), MappedMerges(model)
+        if materialize:
+            vocab, merges = dict(vocab.items()), dict(merges.items())
+        tokenizer.vocab = vocab
+        tokenizer.merges = merges
+        return model
+
+    vocab = MappedStrVocab(model)
+    strings = list(vocab) if materialize or model.meta["num_merges"] or model.has_section("scores") else None
+    tokenizer.vocab = set(strings) if materialize else vocab
+    # Les fusions et scores des tokenizers à vocabulaire `str` sont peu
+    # utilisés à l'encodage : ils sont toujours reconstruits en dict
+    tokenizer.merges = {
+        (strings[a], strings[b]): strings[new]
+        for a, b, new in zip(model.section("merge_left"), model.section("merge_right"), model.section("merge_new"))
+    }
+    if model.has_section("scores"):
+        tokenizer.log_probs = dict(zip(strings, model.section("scores")))
+    return model
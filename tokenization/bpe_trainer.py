@@ -0,0 +1,459 @@
+import heapq
+from collections import Counter
+
+import regex as re
+
+# Découpage par défaut (style GPT-2) utilisé en mode dédupliqué sans motif
+GPT2_SPLIT_PATTERN = r"""'(?:[sdmt]|ll|ve|re)| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+"""
+
+
+class IncrementalBpeTrainer:
+    """
+    Moteur d'entraînement BPE incrémental.
+
+    Au lieu de recompter toutes les paires et de réécrire tout le corpus à
+    chaque fusion, on maintient :
+      - une liste doublement chaînée des symboles (prev / next),
+      - le compte de chaque paire adjacente,
+      - l'index paire -> positions où elle apparaît,
+      - un tas (max-heap) des paires candidates, invalidé paresseusement.
+
+    Une fusion ne coûte donc que le nombre d'occurrences de la paire fusionnée.
+
+    Le départage des égalités est identique à `max(stats(tokens), key=...)` :
+    à compte égal, la paire dont la première occurrence est la plus à gauche
+    dans la séquence courante l'emporte.
+    """
+
+    def __init__(self, words, weights=None):
+        """
+        Args:
+            words (List[List[int]]): séquences d'IDs ; les paires ne traversent
+                jamais la frontière entre deux séquences
+            weights (List[int] | None): poids (fréquence) de chaque séquence,
+                1 par défaut
+        """
+        self.ids = []
+        self.prev = []
+        self.next = []
+        # Poids par position ; None si toutes les séquences ont un poids de 1
+        self.weight = [] if weights is not None else None
+
+        for w_idx, word in enumerate(words):
+            start = len(self.ids)
+            n = len(word)
+            self.ids.extend(word)
+            self.prev.extend(range(start - 1, start + n - 1))
+            self.next.extend(range(start + 1, start + n + 1))
+            if n:
+                self.prev[start] = -1
+                self.next[-1] = -1
+            if self.weight is not None:
+                self.weight.extend([weights[w_idx]] * n)
+
+        self.counts = {}
+        self.where = {}
+        # Borne inférieure de la première position de chaque paire ;
+        # exacte sauf si la paire figure dans `dirty`
+        self.first = {}
+        self.dirty = set()
+
+        ids, nxt = self.ids, self.next
+        for pos in range(len(ids)):
+            q = nxt[pos]
+            if q != -1:
+                self._add(ids[pos], ids[q], pos)
+
+        self.heap = [(self._priority(pair), self.first[pair], pair) for pair in self.counts]
+        heapq.heapify(self.heap)
+
+    def _priority(self, pair):
+        # Clé de tri principale (plus petite = meilleure) : ici le compte de la paire
+        return -self.counts[pair]
+
+    def _weight(self, pos):
+        return 1 if self.weight is None else self.weight[pos]
+
+    def _add(self, a, b, pos):
+        pair = (a, b)
+        w = self._weight(pos)
+        if pair in self.counts:
+            self.counts[pair] += w
+            self.where[pair].add(pos)
+            if pos < self.first[pair]:
+                self.first[pair] = pos
+        else:
+            self.counts[pair] = w
+            self.where[pair] = {pos}
+            self.first[pair] = pos
+        return pair
+
+    def _remove(self, a, b, pos):
+        pair = (a, b)
+        occ = self.where.get(pair)
+        if occ is None or pos not in occ:
+            return
+        occ.discard(pos)
+        self.counts[pair] -= self._weight(pos)
+        if not occ:
+            del self.counts[pair], self.where[pair], self.first[pair]
+            self.dirty.discard(pair)
+        elif pos == self.first[pair]:
+            self.dirty.add(pair)
+
+    def _first(self, pair):
+        # Recalcul paresseux de la première occurrence
+        if pair in self.dirty:
+            self.first[pair] = min(self.where[pair])
+            self.dirty.discard(pair)
+        return self.first[pair]
+
+    def best_pair(self):
+        """
+        Renvoie la paire la plus fréquente (et son compte), ou None si plus
+        aucune paire n'existe. Les entrées obsolètes du tas sont réinsérées
+        avec leur clé à jour.
+        """
+        heap = self.heap
+        while heap:
+            priority, first, pair = heap[0]
+            count = self.counts.get(pair)
+            if count is None:
+                heapq.heappop(heap)
+                continue
+            true_priority = self._priority(pair)
+            true_first = self._first(pair)
+            if priority == true_priority and first == true_first:
+                return pair, count
+            heapq.heapreplace(heap, (true_priority, true_first, pair))
+        return None
+
+    def merge(self, pair, rep):
+        """
+        Fusionne toutes les occurrences (non chevauchantes, de gauche à droite)
+        de `pair` en un nouveau symbole `rep`.
+
+        Returns:
+            int: nombre de fusions appliquées, pondéré par la fréquence des mots
+        """
+        a, b = pair
+        ids, prev, nxt = self.ids, self.prev, self.next
+        occ = self.where.get(pair)
+        if not occ:
+            return 0
+        increased = set()
+        merged = 0
+
+        for p in sorted(occ):
+            if p not in occ:
+                # Occurrence consommée par une fusion chevauchante (ex. "aaa")
+                continue
+            q = nxt[p]
+            merged += self._weight(p)
+            self._remove(a, b, p)
+
+            left = prev[p]
+            if left != -1:
+                self._remove(ids[left], a, left)
+                increased.add(self._add(ids[left], rep, left))
+
+            right = nxt[q]
+            if right != -1:
+                self._remove(b, ids[right], q)
+                increased.add(self._add(rep, ids[right], p))
+
+            ids[p] = rep
+            ids[q] = -1
+            nxt[p] = right
+            if right != -1:
+                prev[right] = p
+
+        self._on_merged(pair, rep, merged, increased)
+        return merged
+
+    def _on_merged(self, pair, rep, merged, increased):
+        # Les paires créées ou renforcées par la fusion peuvent devenir meilleures
+        self._push(increased)
+
+    def _push(self, pairs):
+        # Réinsère les paires dont la clé a pu s'améliorer depuis leur dernière entrée
+        for pair in pairs:
+            if pair in self.counts:
+                heapq.heappush(self.heap, (self._priority(pair), self.first[pair], pair))
+
+    def export_words(self):
+        """
+        État courant des séquences, symboles fusionnés compris (voir checkpoint).
+        Un moteur reconstruit à partir de cet état choisit les mêmes fusions.
+
+        Returns:
+            tuple: (words, weights) ; weights vaut None si toutes les séquences pèsent 1
+        """
+        ids, prev = self.ids, self.prev
+        words = []
+        weights = [] if self.weight is not None else None
+        for pos, symbol in enumerate(ids):
+            if symbol == -1:
+                continue
+            if prev[pos] == -1:
+                words.append([])
+                if weights is not None:
+                    weights.append(self.weight[pos])
+            words[-1].append(symbol)
+        return words, weights
+
+    def train(self, num_merges, start_idx=256, progress=None, checkpoint=None):
+        """
+        Applique jusqu'à `num_merges` fusions.
+
+        Args:
+            progress (TrainingProgress | None): suivi de l'avancement (voir profiler)
+            checkpoint (Callable | None): appelé avec (moteur, fusions) après chaque
+                fusion, puis avec final=True (voir checkpoint.BpeCheckpointer)
+        Returns:
+            dict: (id1, id2) -> nouvel ID, dans l'ordre des fusions
+        """
+        merges = {}
+        for i in range(num_merges):
+            best = self.best_pair()
+            if best is None:
+                break
+            pair, _ = best
+            idx = start_idx + i
+            self.merge(pair, idx)
+            merges[pair] = idx
+            if progress is not None:
+                progress.update(i + 1)
+            if checkpoint is not None:
+                checkpoint(self, merges)
+        if progress is not None:
+            progress.finish(len(merges))
+        if checkpoint is not None:
+            checkpoint(self, merges, final=True)
+        return merges
+
+
+class WordPieceScoreTrainer(IncrementalBpeTrainer):
+    """
+    Variante du moteur incrémental qui classe les paires selon le score
+    WordPiece freq(ab) / (freq(a) * freq(b)) au lieu de freq(ab).
+
+    Les fréquences unitaires des symboles sont tenues à jour à chaque fusion ;
+    seules les paires contenant un symbole dont la fréquence a baissé
+    (donc dont le score a pu monter) sont réinsérées dans le tas.
+    Les paires de compte inférieur à `min_count` ne sont pas candidates.
+    """
+
+    def __init__(self, words, weights=None, min_count=1):
+        self.min_count = min_count
+        self.unit_counts = Counter()
+        for w_idx, word in enumerate(words):
+            weight = 1 if weights is None else weights[w_idx]
+            for symbol in word:
+                self.unit_counts[symbol] += weight
+        self.pairs_by_symbol = {}
+        super().__init__(words, weights)
+
+    def _priority(self, pair):
+        a, b = pair
+        return -self.counts[pair] / (self.unit_counts[a] * self.unit_counts[b])
+
+    def _add(self, a, b, pos):
+        if (a, b) not in self.counts:
+            self.pairs_by_symbol.setdefault(a, set()).add((a, b))
+            self.pairs_by_symbol.setdefault(b, set()).add((a, b))
+        return super()._add(a, b, pos)
+
+    def _remove(self, a, b, pos):
+        super()._remove(a, b, pos)
+        pair = (a, b)
+        if pair not in self.counts and pair in self.pairs_by_symbol.get(a, ()):
+            self.pairs_by_symbol[a].discard(pair)
+            self.pairs_by_symbol[b].discard(pair)
+
+    def best_pair(self):
+        while True:
+            best = super().best_pair()
+            if best is None or best[1] >= self.min_count:
+                return best
+            # Paire trop rare : elle reviendra dans le tas si son compte augmente
+            heapq.heappop(self.heap)
+
+    def _on_merged(self, pair, rep, merged, increased):
+        a, b = pair
+        self.unit_counts[a] -= merged
+        self.unit_counts[b] -= merged
+        self.unit_counts[rep] += merged
+        # freq(a) et freq(b) ont baissé : le score des paires qui les contiennent a monté
+        self._push(increased | self.pairs_by_symbol.get(a, set()) | self.pairs_by_symbol.get(b, set()))
+
+
+def train_merges(words, weights, num_merges, num_workers=None, backend="incremental", start_idx=256,
+                 progress=None, checkpoint=None):
+    """
+    Apprend `num_merges` fusions, en séquentiel ou, si `num_workers` est
+    donné, avec ShardedBpeTrainer. backend="numpy" utilise le noyau
+    vectorisé de numpy_kernel. Tous les modes donnent les mêmes fusions ;
+    `progress` (TrainingProgress) reçoit l'avancement et `checkpoint`
+    (moteur incrémental seulement) écrit les points de reprise.
+
+    Returns:
+        dict: (id1, id2) -> nouvel ID, dans l'ordre des fusions
+    """
+    if backend == "numpy":
+        if num_workers:
+            raise ValueError("The numpy backend does not support num_workers.")
+        if checkpoint is not None:
+            raise ValueError("Checkpointing requires the incremental backend.")
+        from . import numpy_kernel
+        return numpy_kernel.train(words, weights, num_merges, start_idx, progress)
+    if backend != "incremental":
+        raise ValueError(f"Unsupported backend: {backend}")
+    if not num_workers:
+        return IncrementalBpeTrainer(words, weights).train(num_merges, start_idx, progress, checkpoint)
+    from .sharded_trainer import ShardedBpeTrainer
+    with ShardedBpeTrainer(words, weights, num_workers) as trainer:
+        return trainer.train(num_merges, start_idx, progress, checkpoint)
+
+
+def iter_string_merges(word_freqs, scoring="frequency", min_frequency=1, num_workers=None, checkpoint=None):
+    """
+    Fusions successives sur des mots découpés en symboles `str` (WordPiece).
+
+    Le symbole fusionné est ''.join(paire) ; deux paires différentes donnant
+    la même chaîne produisent le même symbole. L'appelant arrête l'itération
+    quand son vocabulaire est plein ; la fusion annoncée n'est appliquée
+    qu'à la reprise du générateur.
+
+    Args:
+        word_freqs (Mapping[Tuple[str, ...], int]): séquence de symboles -> fréquence
+        scoring (str): "frequency" (paire la plus fréquente) ou "wordpiece"
+            (freq(ab) / (freq(a) * freq(b)))
+        min_frequency (int): compte minimal d'une paire fusionnée
+        num_workers (int | None): nombre de processus pour le comptage des
+            paires en shards (mode "frequency" uniquement)
+        checkpoint (Callable | None): voir iter_symbol_merges
+    Yields:
+        tuple: ((symbole1, symbole2), nouveau symbole, compte de la paire)
+    """
+    symbol_ids = {}
+    words = [[symbol_ids.setdefault(symbol, len(symbol_ids)) for symbol in word] for word in word_freqs]
+    return iter_symbol_merges(words, list(word_freqs.values()), list(symbol_ids), scoring, min_frequency,
+                              num_workers, checkpoint)
+
+
+def iter_symbol_merges(words, weights, symbols, scoring="frequency", min_frequency=1, num_workers=None,
+                       checkpoint=None):
+    """
+    Comme iter_string_merges, sur des mots déjà convertis en indices de
+    `symbols` (par exemple l'état d'un point de reprise).
+
+    Args:
+        checkpoint (Callable | None): appelé avec (export, terminé) avant
+            chaque fusion annoncée et quand plus aucune paire n'est fusionnable ;
+            toutes les fusions déjà annoncées sont alors appliquées et export()
+            renvoie (words, weights, symbols)
+    """
+    symbol_ids = {symbol: i for i, symbol in enumerate(symbols)}
+    if scoring not in ("frequency", "wordpiece"):
+        raise ValueError(f"Unsupported scoring: {scoring}")
+    if scoring == "wordpiece" and num_workers:
+        raise ValueError("Sharded training only supports frequency scoring.")
+    if num_workers:
+        from .sharded_trainer import ShardedBpeTrainer
+        trainer = ShardedBpeTrainer(words, weights, num_workers)
+    elif scoring == "wordpiece":
+        trainer = WordPieceScoreTrainer(words, weights, min_count=min_frequency)
+    else:
+        trainer = IncrementalBpeTrainer(words, weights)
+    del words
+
+    try:
+        yield from _merge_strings(trainer, symbols, symbol_ids, min_frequency, checkpoint)
+    finally:
+        if num_workers:
+            trainer.close()
+
+
+def _merge_strings(trainer, symbols, symbol_ids, min_frequency, checkpoint=None):
+    def export():
+        return trainer.export_words() + (list(symbols),)
+
+    while True:
+        best = trainer.best_pair()
+        if best is None or best[1] < min_frequency:
+            if checkpoint is not None:
+                checkpoint(export, True)
+            return
+        if checkpoint is not None:
+            checkpoint(export, False)
+        pair, count = best
+        str_pair = (symbols[pair[0]], symbols[pair[1]])
+        new_token = ''.join(str_pair)
+        rep = symbol_ids.get(new_token)
+        if rep is None:
+            rep = len(symbols)
+            symbol_ids[new_token] = rep
+            symbols.append(new_token)
+        yield str_pair, new_token, count
+        trainer.merge(pair, rep)
+
+
+def count_chunks(corpus, pattern=None, segment=None):
+    """
+    Compte une seule fois chaque morceau pré-tokenisé du corpus.
+
+    Args:
+        corpus (str): texte d'entraînement
+        pattern: motif regex (compilé ou non) ; GPT2_SPLIT_PATTERN par défaut
+        segment (Callable[[str], List[str]] | None): redécoupe chaque morceau
+            (pré-segmentation morphologique), appliqué une fois par morceau distinct
+    Returns:
+        Counter: tuple d'octets UTF-8 -> fréquence, dans l'ordre de première apparition
+    """
+    pattern = pattern or GPT2_SPLIT_PATTERN
+    chunk_counts = Counter(m.group() for m in re.finditer(pattern, corpus))
+    if segment is not None:
+        pieces = Counter()
+        for chunk, freq in chunk_counts.items():
+            for piece in segment(chunk):
+                pieces[piece] += freq
+        chunk_counts = pieces
+    return Counter({tuple(chunk.encode("utf-8")): freq for chunk, freq in chunk_counts.items()})
+
+
+def prepare_training_words(corpus, pattern=None, dedup=False, segment=None):
+    """
+    Prépare les séquences d'octets à passer à IncrementalBpeTrainer.
+
+    Sans déduplication, tous les morceaux sont concaténés en une seule
+    séquence (les fusions peuvent alors traverser les frontières de morceaux).
+    Avec déduplication, chaque morceau unique (redécoupé par `segment` si
+    donné, voir count_chunks) devient une séquence pondérée par sa fréquence.
+
+    Returns:
+        tuple: (words, weights, stats) ; weights vaut None sans déduplication
+    """
+    if segment is not None and not dedup:
+        raise ValueError("Morpheme pre-segmentation requires dedup=True.")
+    if not dedup:
+        if pattern:
+            tokens = [b for chunk in re.findall(pattern, corpus) for b in chunk.encode("utf-8")]
+        else:
+            tokens = list(corpus.encode("utf-8"))
+        return [tokens], None, {"total_bytes": len(tokens), "stored_bytes": len(tokens), "reduction_ratio": 1.0}
+
+    chunk_counts = count_chunks(corpus, pattern, segment)
+    words = [list(chunk) for chunk in chunk_counts]
+    weights = list(chunk_counts.values())
+    total_bytes = sum(len(chunk) * freq for chunk, freq in chunk_counts.items())
+    stored_bytes = sum(len(chunk) for chunk in chunk_counts)
+    stats = {
+        "total_chunks": sum(weights),
+        "unique_chunks": len(words),
+        "total_bytes": total_bytes,
+        "stored_bytes": stored_bytes,
+        # Facteur de réduction de la mémoire de travail (octets du corpus / octets stockés)
+        "reduction_ratio": total_bytes / stored_bytes if stored_bytes else 1.0,
+    }
+    return words, weights, stats
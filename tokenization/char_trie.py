@@ -0,0 +1,103 @@
+from array import array
+
+# Décalage suffisant pour tous les points de code Unicode (< 2**21)
+_CODE_BITS = 21
+
+
+class CharTrie:
+    """
+    Trie compact pour la recherche du plus long préfixe.
+
+    Les nœuds sont numérotés ; les transitions sont rangées dans un unique
+    dictionnaire d'entiers (nœud << 21 | code) -> nœud fils et la valeur de
+    chaque nœud dans un tableau `array('i')` (-1 si le nœud n'est pas terminal).
+    Une recherche coûte O(L) et n'alloue aucune sous-chaîne temporaire.
+
+    Les clés peuvent être des `str` (codes = ord des caractères) ou des
+    `bytes` (codes = octets).
+    """
+
+    def __init__(self, keys=()):
+        self._edges = {}
+        self._values = array('i', [-1])
+        self.max_len = 0
+        for key in keys:
+            self.add(key)
+
+    def __len__(self):
+        return sum(1 for value in self._values if value >= 0)
+
+    def add(self, key, value=0):
+        """
+        Ajoute une clé ; si elle existe déjà, la première valeur est conservée.
+        """
+        edges, values = self._edges, self._values
+        node = 0
+        for c in key:
+            code = c if isinstance(c, int) else ord(c)
+            edge = (node << _CODE_BITS) | code
+            child = edges.get(edge)
+            if child is None:
+                child = len(values)
+                values.append(-1)
+                edges[edge] = child
+            node = child
+        if values[node] < 0:
+            values[node] = value
+        if len(key) > self.max_len:
+            self.max_len = len(key)
+
+    def get(self, key, default=None):
+        node = 0
+        for c in key:
+            node = self._edges.get((node << _CODE_BITS) | (c if isinstance(c, int) else ord(c)))
+            if node is None:
+                return default
+        value = self._values[node]
+        return value if value >= 0 else default
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def longest_match(self, word, start=0):
+        """
+        Cherche le plus long élément du trie commençant à word[start].
+
+        Args:
+            word (str): mot à parcourir
+            start (int): position de départ
+        Returns:
+            int: position de fin du plus long match, ou `start` si aucun
+        """
+        edges, values = self._edges, self._values
+        node = 0
+        end = start
+        for i in range(start, min(len(word), start + self.max_len)):
+            node = edges.get((node << _CODE_BITS) | ord(word[i]))
+            if node is None:
+                break
+            if values[node] >= 0:
+                end = i + 1
+        return end
+
+    def prefix_matches(self, codes, start=0):
+        """
+        Énumère en un seul parcours tous les éléments du trie qui commencent
+        à codes[start].
+
+        Args:
+            codes (Sequence[int] | str): séquence de codes (ex. octets) ou chaîne
+            start (int): position de départ
+        Yields:
+            tuple: (position de fin, valeur)
+        """
+        edges, values = self._edges, self._values
+        code_of = ord if isinstance(codes, str) else int
+        node = 0
+        for i in range(start, min(len(codes), start + self.max_len)):
+            node = edges.get((node << _CODE_BITS) | code_of(codes[i]))
+            if node is None:
+                return
+            value = values[node]
+            if value >= 0:
+                yield i + 1, value
@@ -0,0 +1,139 @@
+import os
+import zlib
+from array import array
+
+from .binary_model import BinaryModel, write_sections
+
+# Points de reprise des longs entraînements (NaiveBpe.train,
+# WordPieceVocabBuilder.build_vocab), dans le même conteneur que les modèles
+# binaires :
+#   word_lengths  'I'  nombre de symboles de chaque mot
+#   word_symbols  'i'  symboles courants (après fusions) de tous les mots
+#   word_weights  'q'  fréquence de chaque mot (optionnel)
+#   merge_left / merge_right / merge_new  'i'  fusions déjà apprises, par rang
+#   <nom>_offsets 'I' / <nom>_blob 'B'  listes de chaînes (symboles, vocabulaire)
+#
+# Les comptes de paires ne sont pas stockés : ils se recalculent exactement
+# à partir des mots. Les positions relatives des symboles étant conservées,
+# le moteur reconstruit départage les égalités comme l'entraînement
+# ininterrompu et produit les mêmes fusions.
+
+CHECKPOINT_VERSION = 1
+
+
+def corpus_digest(texts):
+    """CRC32 d'un corpus (str ou liste de str), pour vérifier qu'une reprise porte sur le même corpus."""
+    if isinstance(texts, str):
+        texts = [texts]
+    crc = 0
+    for text in texts:
+        crc = zlib.crc32(text.encode("utf-8"), crc)
+        crc = zlib.crc32(b"\0", crc)
+    return crc
+
+
+def _pack_strings(strings):
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = array('I', [0])
+    for token in encoded:
+        offsets.append(offsets[-1] + len(token))
+    return offsets, array('B', b"".join(encoded))
+
+
+def save_checkpoint(path, meta, words, weights=None, merges=(), strings=None):
+    """
+    Écrit un point de reprise (fichier temporaire puis renommage : un
+    arrêt pendant l'écriture laisse le point de reprise précédent intact).
+
+    Args:
+        meta (dict): paramètres de l'entraînement (JSON)
+        words (List[List[int]]): symboles courants de chaque mot
+        weights (List[int] | None): fréquence de chaque mot
+        merges (Iterable[Tuple[int, int, int]]): fusions (gauche, droite, nouvel ID)
+        strings (dict | None): nom -> liste de chaînes
+    """
+    lengths = array('I')
+    symbols = array('i')
+    for word in words:
+        lengths.append(len(word))
+        symbols.extend(word)
+    merges = list(merges)
+    sections = [
+        ("word_lengths", lengths),
+        ("word_symbols", symbols),
+        ("merge_left", array('i', [m[0] for m in merges])),
+        ("merge_right", array('i', [m[1] for m in merges])),
+        ("merge_new", array('i', [m[2] for m in merges])),
+    ]
+    if weights is not None:
+        sections.append(("word_weights", array('q', weights)))
+    for name, values in (strings or {}).items():
+        offsets, blob = _pack_strings(values)
+        sections += [(f"{name}_offsets", offsets), (f"{name}_blob", blob)]
+
+    tmp_path = path + ".tmp"
+    write_sections(tmp_path, sections, dict(meta, checkpoint=CHECKPOINT_VERSION))
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path):
+    """
+    Returns:
+        dict: "meta", "words", "weights" (None si absent), "merges" (liste de
+            triplets) et "strings" (nom -> liste de chaînes)
+    """
+    model = BinaryModel(path)
+    try:
+        if "checkpoint" not in model.meta:
+            raise ValueError(f"Not a training checkpoint: {path}")
+        if model.meta["checkpoint"] > CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {model.meta['checkpoint']}")
+        arrays = {}
+        for name, (_, _, typecode) in model.meta["sections"].items():
+            with model.section(name) as view:
+                arrays[name] = array(typecode, view.tobytes())
+        meta = model.meta
+    finally:
+        model.close()
+
+    words = []
+    pos = 0
+    symbols = arrays["word_symbols"]
+    for length in arrays["word_lengths"]:
+        words.append(symbols[pos:pos + length].tolist())
+        pos += length
+    strings = {}
+    for name in arrays:
+        if name.endswith("_offsets"):
+            key = name[:-len("_offsets")]
+            offsets, blob = arrays[name], arrays[key + "_blob"].tobytes()
+            strings[key] = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+    weights = arrays["word_weights"].tolist() if "word_weights" in arrays else None
+    merges = list(zip(arrays["merge_left"], arrays["merge_right"], arrays["merge_new"]))
+    return {"meta": meta, "words": words, "weights": weights, "merges": merges, "strings": strings}
+
+
+class BpeCheckpointer:
+    """
+    Callback `checkpoint` de IncrementalBpeTrainer.train et
+    ShardedBpeTrainer.train : écrit un point de reprise toutes les
+    `interval` fusions, et à la fin de l'entraînement (pour pouvoir
+    l'étendre ensuite à un vocabulaire plus grand).
+    """
+
+    def __init__(self, path, meta, interval=1000, merges=()):
+        self.path = path
+        self.meta = meta
+        self.interval = interval
+        # Fusions apprises avant cette session (reprise ou extension)
+        self.merges = list(merges)
+        self._saved = None
+
+    def __call__(self, trainer, merges, final=False):
+        done = len(merges)
+        if self._saved == done or not (final or done % self.interval == 0):
+            return
+        words, weights = trainer.export_words()
+        all_merges = self.merges + [(a, b, new) for (a, b), new in merges.items()]
+        save_checkpoint(self.path, self.meta, words, weights, all_merges)
+        self._saved = done
@@ -1,98 +1,179 @@
 import regex as re
-from base_tokenizer import BaseTokenizer
+from array import array
+from time import perf_counter
+from .base_tokenizer import BaseTokenizer
+from .bpe_trainer import GPT2_SPLIT_PATTERN, prepare_training_words, train_merges
+from .offsets import encode_with_char_map, extend_char_map, token_spans
+from .char_trie import CharTrie
 
 
 class DynamicBpe(BaseTokenizer):
     def __init__(self, pattern=None):
         super().__init__()
         self.pattern = re.compile(pattern) if pattern else None
-
-    def train(self, corpus, vocab_size):
+        self.train_stats = {}
+        # Vrai si aucune fusion ne traverse une frontière de morceau (entraînement dédupliqué)
+        self.chunk_boundaries = False
+        # Trie d'octets du vocabulaire, reconstruit quand self.vocab change
+        self._byte_trie = CharTrie()
+        self._indexed_vocab = None
+
+    def train(self, corpus, vocab_size, dedup=False, num_workers=None, backend="incremental"):
+        """
+        Entraîne les fusions BPE ; avec dedup=True, sur les morceaux uniques pondérés,
+        éventuellement répartis sur num_workers processus. backend="numpy" utilise
+        le noyau vectorisé de numpy_kernel. Avec la pré-segmentation morphologique
+        (enable_morpho_segmentation), entraîne sur les morphèmes uniques (dedup implicite).
+        """
         assert vocab_size >= 256
+        dedup = dedup or self._morpho is not None
+        if num_workers and not dedup:
+            raise ValueError("num_workers requires dedup=True (shards are sets of unique chunks).")
         num_merges = vocab_size - 256
-        merges = {}
         vocab = {idx: bytes([idx]) for idx in range(256)}
 
         # Tokenization
-        if self.pattern:
-            text_chunks = re.findall(self.pattern, corpus)
-            tokens = [list(chunk.encode("utf-8")) for chunk in text_chunks]
-            tokens = [item for sublist in tokens for item in sublist]
-        else:
-            tokens = list(corpus.encode("utf-8"))
-
-        for i in range(num_merges):
-            stat = self._get_stats(tokens)
-            if not stat:
-                break
-
-            pair = max(stat, key=stat.get)
-            idx = 256 + i
-            tokens = self._merge(tokens, pair, idx)
-            merges[pair] = idx
+        prof = self._profiler
+        if prof is not None:
+            start = perf_counter()
+        segment = self._morpho.split if self._morpho is not None else None
+        words, weights, train_stats = prepare_training_words(corpus, self.pattern, dedup, segment)
+        if prof is not None:
+            prof.add_time("prepare", perf_counter() - start)
+            start = perf_counter()
+
+        merges = train_merges(words, weights, num_merges, num_workers, backend,
+                              progress=self._training_progress(num_merges))
+        del words
+        if prof is not None:
+            prof.add_time("train", perf_counter() - start)
+        for pair, idx in merges.items():
             vocab[idx] = vocab[pair[0]] + vocab[pair[1]]
+        train_stats["num_merges"] = len(merges)
 
         self.vocab = vocab
         self.merges = merges
+        self.train_stats = train_stats
+        self.chunk_boundaries = dedup
+        self._build_index()
+        self._warn_if_cache_unused()
 
-    def tokenize(self, text):
+    def tokenize(self, text, return_offsets=False):
         """
         Tokenise avec programmation dynamique pour trouver le meilleur découpage.
+        Avec return_offsets, renvoie (IDs, array('i') des spans [début, fin] de
+        chaque token en caractères de `text`).
         """
+        if self._indexed_vocab is not self.vocab:
+            self._build_index()
+        if return_offsets:
+            return self._tokenize_with_offsets(text)
+        prof = self._profiler
+        if prof is not None:
+            start = perf_counter()
+
+        if self.chunk_boundaries or self._morpho is not None:
+            # Découpage optimal morceau par morceau (mis en cache si activé)
+            chunks = self._split_morphemes(re.findall(self.pattern or GPT2_SPLIT_PATTERN, text))
+            if prof is not None:
+                prof.add_time("split", perf_counter() - start)
+            output = []
+            for ids in self._encode_units(chunks, self._encode_chunk):
+                output.extend(ids)
+            return output
+
         if self.pattern:
             text_chunks = re.findall(self.pattern, text)
             tokens = [list(chunk.encode("utf-8")) for chunk in text_chunks]
             input_bytes = [item for sublist in tokens for item in sublist]
         else:
             input_bytes = list(text.encode("utf-8"))
+        if prof is None:
+            return self._segment(input_bytes)
+
+        prof.add_time("split", perf_counter() - start)
+        start = perf_counter()
+        output = self._segment(input_bytes)
+        prof.add_time("segment", perf_counter() - start)
+        return output
+
+    def _uses_unit_cache(self):
+        return self.chunk_boundaries or self._morpho is not None
+
+    def _split_pattern(self):
+        # Modèle entraîné par morceaux : tokenize() découpe avec GPT2_SPLIT_PATTERN à défaut de motif
+        if self.chunk_boundaries or self._morpho is not None:
+            return self.pattern or GPT2_SPLIT_PATTERN
+        return self.pattern
+
+    def _tokenize_with_offsets(self, text):
+        # Même découpage que tokenize(), en suivant la position d'origine de chaque octet
+        chunk_boundaries = self.chunk_boundaries or self._morpho is not None
+        pattern = self.pattern or (GPT2_SPLIT_PATTERN if chunk_boundaries else None)
+        pieces = [(m.start(), m.group()) for m in re.finditer(pattern, text)] if pattern else [(0, text)]
+        if chunk_boundaries:
+            pieces = self._split_morpheme_pieces(pieces)
+            output = []
+            for chunk_ids in self._encode_units([chunk for _, chunk in pieces], self._encode_chunk):
+                output.extend(chunk_ids)
+            char_map = array('i')
+            for start, chunk in pieces:
+                extend_char_map(char_map, start, chunk)
+        else:
+            tokens, char_map = encode_with_char_map(pieces)
+            output = self._segment(tokens)
+        return output, token_spans(char_map, [len(self.vocab[t]) for t in output])
+
+    def _encode_chunk(self, chunk):
+        return self._segment(list(chunk.encode("utf-8")))
 
+    def _segment(self, input_bytes):
         n = len(input_bytes)
         dp = [float("inf")] * (n + 1)
         path = [-1] * (n + 1)
         dp[0] = 0
 
-        for i in range(1, n + 1):
-            for j in range(max(0, i - 10), i):  # limit to reasonable token size
-                chunk = input_bytes[j:i]
-                token_id = self._get_token_id(chunk)
-                if token_id is not None and dp[j] + 1 < dp[i]:
-                    dp[i] = dp[j] + 1
-                    path[i] = (j, token_id)
+        # Pour chaque position de départ, on parcourt le trie une seule fois et
+        # on relâche toutes les fins de tokens du vocabulaire rencontrées
+        trie = self._byte_trie
+        for j in range(n):
+            cost = dp[j] + 1
+            if cost == float("inf"):
+                continue
+            for end, token_id in trie.prefix_matches(input_bytes, j):
+                if cost < dp[end]:
+                    dp[end] = cost
+                    path[end] = (j, token_id)
 
         # Backtrack to get tokens
         i = n
         output = []
         while i > 0:
             j, token_id = path[i]
-            output.insert(0, token_id)
+            output.append(token_id)
             i = j
+        output.reverse()
 
+        if self._profiler is not None:
+            # Un parcours du trie par position de départ
+            self._profiler.count("bytes", n)
+            self._profiler.count("vocab_lookups", n)
         return output
 
     def decode(self, tokens):
         my_bytes = b"".join(self.vocab[i] for i in tokens)
         return my_bytes.decode("utf-8", errors="replace")
 
-    def _get_token_id(self, byte_seq):
-        for token_id, token_bytes in self.vocab.items():
-            if token_bytes == bytes(byte_seq):
-                return token_id
-        return None
-
-    def _get_stats(self, tokens):
-        counts = {}
-        for pair in zip(tokens, tokens[1:]):
-            counts[pair] = counts.get(pair, 0) + 1
-        return counts
-
-    def _merge(self, tokens, pair, rep):
-        i = 0
-        new_text = []
-        while i < len(tokens):
-            if i < len(tokens) - 1 and tokens[i] == pair[0] and tokens[i + 1] == pair[1]:
-                new_text.append(rep)
-                i += 2
-            else:
-                new_text.append(tokens[i])
-                i += 1
-        return new_text
+    def _build_index(self):
+        """
+        Construit le trie d'octets du vocabulaire.
+        À séquence d'octets égale, l'ID le plus petit est conservé.
+        """
+        seen = set()
+        trie = CharTrie()
+        for token_id, token_bytes in sorted(self.vocab.items()):
+            if token_bytes not in seen:
+                seen.add(token_bytes)
+                trie.add(token_bytes, token_id)
+        self._byte_trie = trie
+        self._indexed_vocab = self.vocab
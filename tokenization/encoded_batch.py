@@ -0,0 +1,64 @@
+class EncodedBatch:
+    """
+    Résultat compact de BaseTokenizer.encode_batch : les IDs de toutes les
+    séquences dans un seul tampon `array('i')` (vue NumPy int32 sans copie
+    avec to_numpy()), et les bornes de chaque séquence dans `offsets`
+    (`array('q')`, len(batch) + 1 valeurs).
+
+    Avec padding, toutes les séquences ont la même longueur et
+    `attention_mask` (`array('b')`, aligné sur `ids`) vaut 1 sur les vrais
+    tokens et 0 sur le padding ; sinon `attention_mask` vaut None.
+    """
+
+    def __init__(self, ids, offsets, attention_mask=None):
+        self.ids = ids
+        self.offsets = offsets
+        self.attention_mask = attention_mask
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.ids[self.offsets[index]:self.offsets[index + 1]]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def lengths(self):
+        # Nombre de vrais tokens (hors padding) de chaque séquence
+        if self.attention_mask is None:
+            return [end - start for start, end in zip(self.offsets, self.offsets[1:])]
+        return [sum(self.attention_mask[start:end]) for start, end in zip(self.offsets, self.offsets[1:])]
+
+    @property
+    def nbytes(self):
+        # Taille des tampons (IDs, offsets, masque), en octets
+        size = len(self.ids) * self.ids.itemsize + len(self.offsets) * self.offsets.itemsize
+        if self.attention_mask is not None:
+            size += len(self.attention_mask) * self.attention_mask.itemsize
+        return size
+
+    def to_numpy(self):
+        """
+        Vue NumPy des IDs (sans copie) : matrice (séquences, longueur) si le
+        batch est paddé, tableau plat sinon.
+
+        Returns:
+            tuple: (ids, attention_mask ou None)
+        """
+        try:
+            # Dépendance optionnelle, importée seulement ici (coût de démarrage)
+            import numpy as np
+        except ImportError:
+            raise ImportError("to_numpy() requires numpy (pip install numpy).")
+        ids = np.frombuffer(self.ids, dtype=np.int32)
+        if self.attention_mask is None:
+            return ids, None
+        mask = np.frombuffer(self.attention_mask, dtype=np.int8)
+        width = self.offsets[1] - self.offsets[0] if len(self) else 0
+        return ids.reshape(len(self), width), mask.reshape(len(self), width)
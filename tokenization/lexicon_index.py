@@ -0,0 +1,453 @@
+import csv
+import itertools
+import math
+import mmap
+import os
+import random
+import shutil
+import tempfile
+import zlib
+from array import array
+from collections.abc import Mapping
+
+from .binary_model import BinaryModel, FileSection, _table_size, write_sections
+
+# Index disque mot -> segmentation morphologique, construit une fois à partir
+# du lexique CSV (train.csv) puis ouvert par mmap : aucune entrée n'est
+# chargée en objets Python, les recherches lisent directement le fichier.
+#   key_offsets   'Q'  début de chaque mot dans keys (N + 1 valeurs)
+#   keys          'B'  mots en UTF-8, concaténés
+#   value_offsets 'Q'  début de chaque segmentation dans values (N + 1 valeurs)
+#   values        'B'  segmentations en UTF-8, concaténées
+#   slots         'I'  table de hachage (crc32, sondage linéaire) mot -> indice + 1
+
+INDEX_VERSION = 1
+
+
+def _source_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+
+
+class _ArrayFile:
+    # Tableau écrit en flux dans un fichier, par blocs de `chunk` éléments
+    def __init__(self, path, typecode, chunk=1 << 16):
+        self.path = path
+        self.typecode = typecode
+        self._file = open(path, "wb")
+        self._buffer = array(typecode)
+        self._chunk = chunk
+
+    def append(self, value):
+        self._buffer.append(value)
+        if len(self._buffer) >= self._chunk:
+            self._buffer.tofile(self._file)
+            del self._buffer[:]
+
+    def close(self):
+        self._buffer.tofile(self._file)
+        self._file.close()
+        return FileSection(self.path, self.typecode)
+
+
+class _MappedFile:
+    # Fichier temporaire ouvert par mmap : `data` (tranches -> bytes) et `view`, tableau `typecode`
+    def __init__(self, path, typecode='B'):
+        self._mm = None
+        if os.path.getsize(path):
+            with open(path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.data = self._mm if self._mm is not None else b""
+        self._base = memoryview(self.data)
+        self.view = self._base.cast(typecode)
+
+    def close(self):
+        self.view.release()
+        self._base.release()
+        if self._mm is not None:
+            self._mm.close()
+
+
+def _write_blob(path, offsets_path):
+    # Fichiers (octets concaténés, offsets 'Q') d'une colonne de chaînes, écrits en flux
+    blob = open(path, "wb")
+    offsets = _ArrayFile(offsets_path, 'Q')
+    offsets.append(0)
+    return blob, offsets
+
+
+def build_lexicon_index(csv_path, index_path, value_field="segmentation"):
+    """
+    Construit l'index à partir du CSV. La clé est la première colonne ; à clé
+    égale, la dernière ligne l'emporte. Les lignes dont le nombre de colonnes
+    ne correspond pas à l'en-tête sont ignorées (comptées dans meta["skipped_lines"]).
+
+    Construction en flux : les lignes sont écrites au fil de la lecture dans
+    des fichiers temporaires à côté de l'index, puis la table de hachage est
+    remplie en relisant ces fichiers par mmap ; seuls des tableaux d'entiers
+    (table, drapeaux des doublons) sont gardés en mémoire.
+
+    Returns:
+        dict: nombre d'entrées et de lignes ignorées
+    """
+    work_dir = tempfile.mkdtemp(prefix=".lexicon-", dir=os.path.dirname(os.path.abspath(index_path)))
+    try:
+        # Passe 1 : lignes du CSV -> fichiers de clés, valeurs, offsets et hachages
+        keys, key_offsets = _write_blob(os.path.join(work_dir, "keys"), os.path.join(work_dir, "key_offsets"))
+        values, value_offsets = _write_blob(os.path.join(work_dir, "values"), os.path.join(work_dir, "value_offsets"))
+        hashes = _ArrayFile(os.path.join(work_dir, "hashes"), 'I')
+        count = 0
+        skipped = 0
+        key_end = value_end = 0
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            cols = next(reader)
+            if value_field not in cols:
+                raise ValueError(f"Column '{value_field}' not found in {csv_path}")
+            value_col = cols.index(value_field)
+            for row in reader:
+                if len(row) != len(cols):
+                    skipped += 1
+                    continue
+                key = row[0].strip().encode("utf-8")
+                value = row[value_col].strip().encode("utf-8")
+                keys.write(key)
+                values.write(value)
+                key_end += len(key)
+                value_end += len(value)
+                key_offsets.append(key_end)
+                value_offsets.append(value_end)
+                hashes.append(zlib.crc32(key))
+                count += 1
+        keys.close()
+        values.close()
+        sections = {
+            "key_offsets": key_offsets.close(),
+            "keys": FileSection(keys.name, 'B'),
+            "value_offsets": value_offsets.close(),
+            "values": FileSection(values.name, 'B'),
+        }
+        hashes.close()
+
+        # Passe 2 : table de hachage ; une clé déjà vue remplace la ligne précédente
+        slots, live = _fill_slots(work_dir, count)
+        num_entries = sum(live)
+        if num_entries < count:
+            sections.update(_compact(work_dir, count, live, slots))
+
+        meta = dict(_source_stamp(csv_path), lexicon=INDEX_VERSION, key_field=cols[0], value_field=value_field,
+                    num_entries=num_entries, skipped_lines=skipped)
+        tmp_path = index_path + ".tmp"
+        write_sections(tmp_path, [(name, sections[name]) for name in
+                                  ("key_offsets", "keys", "value_offsets", "values")] + [("slots", slots)], meta)
+        os.replace(tmp_path, index_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {"num_entries": num_entries, "skipped_lines": skipped}
+
+
+def _fill_slots(work_dir, count):
+    # Table (crc32, sondage linéaire) ligne -> indice + 1 et drapeau des lignes gardées
+    keys = _MappedFile(os.path.join(work_dir, "keys"))
+    offsets = _MappedFile(os.path.join(work_dir, "key_offsets"), 'Q')
+    hashes = _MappedFile(os.path.join(work_dir, "hashes"), 'I')
+    try:
+        blob, starts = keys.data, offsets.view
+        slots = array('I', bytes(4 * _table_size(count)))
+        mask = len(slots) - 1
+        live = bytearray(count)
+        for idx in range(count):
+            key = blob[starts[idx]:starts[idx + 1]]
+            h = hashes.view[idx] & mask
+            while slots[h]:
+                other = slots[h] - 1
+                if blob[starts[other]:starts[other + 1]] == key:
+                    live[other] = 0
+                    break
+                h = (h + 1) & mask
+            slots[h] = idx + 1
+            live[idx] = 1
+        return slots, live
+    finally:
+        for mapped in (keys, offsets, hashes):
+            mapped.close()
+
+
+def _compact(work_dir, count, live, slots):
+    # Réécrit les colonnes sans les lignes remplacées par un doublon et renumérote la table
+    remap = array('I', bytes(4 * count))
+    sections = {}
+    for column in ("keys", "values"):
+        blob = _MappedFile(os.path.join(work_dir, column))
+        offsets = _MappedFile(os.path.join(work_dir, column[:-1] + "_offsets"), 'Q')
+        try:
+            out, out_offsets = _write_blob(os.path.join(work_dir, column + ".live"),
+                                           os.path.join(work_dir, column[:-1] + "_offsets.live"))
+            end = 0
+            new_idx = 0
+            for idx in range(count):
+                if live[idx]:
+                    chunk = blob.data[offsets.view[idx]:offsets.view[idx + 1]]
+                    out.write(chunk)
+                    end += len(chunk)
+                    out_offsets.append(end)
+                    remap[idx] = new_idx
+                    new_idx += 1
+            out.close()
+            sections[column] = FileSection(out.name, 'B')
+            sections[column[:-1] + "_offsets"] = out_offsets.close()
+        finally:
+            blob.close()
+            offsets.close()
+    for h, slot in enumerate(slots):
+        if slot:
+            slots[h] = remap[slot - 1] + 1
+    return sections
+
+
+class LexiconIndex(Mapping):
+    """
+    Index mot -> segmentation ouvert par mmap (voir build_lexicon_index).
+    Se sérialise (pickle) par son chemin : chaque worker rouvre le fichier.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.model = BinaryModel(path)
+        if "lexicon" not in self.model.meta:
+            raise ValueError(f"Not a lexicon index: {path}")
+        self.meta = self.model.meta
+        self._key_offsets = self.model.section("key_offsets")
+        self._keys = self.model.section("keys")
+        self._value_offsets = self.model.section("value_offsets")
+        self._values = self.model.section("values")
+        self._slots = self.model.section("slots")
+
+    def __reduce__(self):
+        return self.__class__, (self.path,)
+
+    def close(self):
+        for view in (self._key_offsets, self._keys, self._value_offsets, self._values, self._slots):
+            view.release()
+        self.model.close()
+
+    def _find(self, key):
+        slots = self._slots
+        offsets = self._key_offsets
+        mask = len(slots) - 1
+        h = zlib.crc32(key) & mask
+        while slots[h]:
+            idx = slots[h] - 1
+            if self._keys[offsets[idx]:offsets[idx + 1]] == key:
+                return idx
+            h = (h + 1) & mask
+        return -1
+
+    def get(self, word, default=None):
+        idx = self._find(word.encode("utf-8"))
+        if idx < 0:
+            return default
+        return bytes(self._values[self._value_offsets[idx]:self._value_offsets[idx + 1]]).decode("utf-8")
+
+    def __getitem__(self, word):
+        value = self.get(word)
+        if value is None:
+            raise KeyError(word)
+        return value
+
+    def __contains__(self, word):
+        return isinstance(word, str) and self._find(word.encode("utf-8")) >= 0
+
+    def __len__(self):
+        return len(self._key_offsets) - 1
+
+    def __iter__(self):
+        offsets = self._key_offsets
+        for idx in range(len(self)):
+            yield bytes(self._keys[offsets[idx]:offsets[idx + 1]]).decode("utf-8")
+
+    def is_stale(self, csv_path):
+        # Vrai si le CSV a changé depuis la construction de l'index
+        stamp = _source_stamp(csv_path)
+        return any(self.meta.get(k) != v for k, v in stamp.items())
+
+
+def open_lexicon_index(csv_path, index_path=None, value_field="segmentation"):
+    """
+    Ouvre l'index du lexique, en le (re)construisant s'il est absent ou plus
+    ancien que le CSV.
+
+    Args:
+        csv_path (str): lexique CSV (train.csv)
+        index_path (str | None): fichier d'index ; csv_path + ".idx" par défaut
+    Returns:
+        LexiconIndex
+    """
+    index_path = index_path or csv_path + ".idx"
+    if os.path.exists(index_path):
+        index = LexiconIndex(index_path)
+        if index.meta["value_field"] == value_field and (not os.path.exists(csv_path) or not index.is_stale(csv_path)):
+            return index
+        index.close()
+    build_lexicon_index(csv_path, index_path, value_field)
+    return LexiconIndex(index_path)
+
+
+_END = object()
+
+
+def _open_uniform(rng):
+    # Tirage uniforme dans ]0, 1[ (log défini)
+    u = rng.random()
+    while u == 0.0:
+        u = rng.random()
+    return u
+
+
+def reservoir_sample(items, k, rng=random):
+    """
+    Échantillon uniforme de `k` éléments en une seule passe, mémoire O(k)
+    (algorithme L de Li, 1994 : les éléments sautés ne coûtent pas de tirage).
+
+    Returns:
+        list: les k éléments (tous si l'itérable en contient moins), dans un ordre quelconque
+    """
+    it = iter(items)
+    reservoir = list(itertools.islice(it, k))
+    if len(reservoir) < k or k == 0:
+        return reservoir
+    w = math.exp(math.log(_open_uniform(rng)) / k)
+    while True:
+        skip = math.floor(math.log(_open_uniform(rng)) / math.log1p(-w)) if w < 1.0 else 0
+        item = next(itertools.islice(it, skip, None), _END)
+        if item is _END:
+            return reservoir
+        reservoir[rng.randrange(k)] = item
+        w *= math.exp(math.log(_open_uniform(rng)) / k)
+
+
+def _parse_line(line):
+    return next(csv.reader([line]), [])
+
+
+def iter_lexicon_rows(csv_path, fields, langs=None, lang_field="lang"):
+    """
+    Parcourt le CSV sans le charger : pour chaque ligne (filtrée sur
+    `langs` si donné), le tuple des colonnes `fields`.
+    """
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        cols = next(reader)
+        missing = [name for name in list(fields) + ([lang_field] if langs else []) if name not in cols]
+        if missing:
+            raise ValueError(f"Column(s) {missing} not found in {csv_path}")
+        positions = [cols.index(name) for name in fields]
+        lang_col = cols.index(lang_field) if langs else None
+        langs = set(langs) if langs else None
+        for row in reader:
+            if len(row) != len(cols) or (langs is not None and row[lang_col] not in langs):
+                continue
+            yield tuple(row[i] for i in positions)
+
+
+def build_language_index(csv_path, index_path, lang_field="lang"):
+    """
+    Construit l'index des positions (octets) des lignes du CSV par langue,
+    pour tirer des échantillons sans relire tout le fichier.
+    Une section 'Q' par langue : rows:<langue>.
+    """
+    rows = {}
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        cols = _parse_line(header.decode("utf-8"))
+        if lang_field not in cols:
+            raise ValueError(f"Column '{lang_field}' not found in {csv_path}")
+        lang_col = cols.index(lang_field)
+        offset = len(header)
+        for line in f:
+            row = _parse_line(line.decode("utf-8"))
+            if len(row) == len(cols):
+                rows.setdefault(row[lang_col], array('Q')).append(offset)
+            offset += len(line)
+    meta = dict(_source_stamp(csv_path), language_index=INDEX_VERSION, columns=cols, lang_field=lang_field)
+    tmp_path = index_path + ".tmp"
+    write_sections(tmp_path, [(f"rows:{lang}", offsets) for lang, offsets in sorted(rows.items())], meta)
+    os.replace(tmp_path, index_path)
+
+
+class LanguageIndex:
+    """Positions des lignes du CSV par langue, ouvertes par mmap (voir build_language_index)."""
+
+    def __init__(self, path, csv_path):
+        self.path = path
+        self.csv_path = csv_path
+        self.model = BinaryModel(path)
+        if "language_index" not in self.model.meta:
+            raise ValueError(f"Not a language index: {path}")
+        self.meta = self.model.meta
+        self.columns = self.meta["columns"]
+        self.rows = {name[len("rows:"):]: self.model.section(name) for name in self.meta["sections"]}
+
+    def close(self):
+        for view in self.rows.values():
+            view.release()
+        self.model.close()
+
+    def is_stale(self):
+        stamp = _source_stamp(self.csv_path)
+        return any(self.meta.get(k) != v for k, v in stamp.items())
+
+    def count(self, langs=None):
+        return sum(len(self.rows.get(lang, ())) for lang in (langs or self.rows))
+
+    def sample(self, k, fields, langs=None, rng=random):
+        """
+        Tire k lignes uniformément parmi celles des langues `langs` (toutes
+        par défaut) et ne lit que ces lignes dans le CSV.
+
+        Returns:
+            List[tuple]: colonnes `fields` des lignes tirées, en ordre aléatoire
+        """
+        missing = [name for name in fields if name not in self.columns]
+        if missing:
+            raise ValueError(f"Column(s) {missing} not found in {self.csv_path}")
+        positions = [self.columns.index(name) for name in fields]
+        groups = [self.rows[lang] for lang in (langs or self.rows) if lang in self.rows]
+        total = sum(len(group) for group in groups)
+        offsets = []
+        for i in rng.sample(range(total), min(k, total)):
+            for group in groups:
+                if i < len(group):
+                    offsets.append(group[i])
+                    break
+                i -= len(group)
+        offsets.sort()  # lecture séquentielle du fichier
+
+        sample = []
+        with open(self.csv_path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                row = _parse_line(f.readline().decode("utf-8"))
+                sample.append(tuple(row[i] for i in positions))
+        rng.shuffle(sample)
+        return sample
+
+
+def open_language_index(csv_path, index_path=None, lang_field="lang"):
+    """
+    Ouvre l'index des langues du lexique, en le (re)construisant s'il est
+    absent ou plus ancien que le CSV.
+
+    Args:
+        index_path (str | None): fichier d'index ; csv_path + ".langidx" par défaut
+    Returns:
+        LanguageIndex
+    """
+    index_path = index_path or csv_path + ".langidx"
+    if os.path.exists(index_path):
+        index = LanguageIndex(index_path, csv_path)
+        if index.meta["lang_field"] == lang_field and not index.is_stale():
+            return index
+        index.close()
+    build_language_index(csv_path, index_path, lang_field)
+    return LanguageIndex(index_path, csv_path)
@@ -0,0 +1,50 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Cache LRU borné des encodages de mots / morceaux.
+
+    `model_key` identifie le modèle pour lequel les entrées ont été calculées ;
+    le tokenizer vide le cache dès que son modèle change.
+    """
+
+    def __init__(self, capacity=10000):
+        if capacity <= 0:
+            raise ValueError("La capacité du cache doit être strictement positive.")
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.model_key = None
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "capacity": self.capacity,
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,7 +1,11 @@
-from collections import Counter
-import math
-from base_tokenizer import BaseTokenizer
-from unigram_bpe import UnigramBPETokenizer
+import os
+import sys
+
+if not __package__:
+    # Exécution directe (python tokenization/main.py) : rend le package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tokenization.unigram_bpe import UnigramBPETokenizer
 
 
 if __name__ == "__main__":
@@ -12,8 +16,9 @@ if __name__ == "__main__":
     unigram_bpe.train(corpus)
 
     # Save and load the tokenizer
-    unigram_bpe.save_tokenizer("unigram_bpe_tokenizer.pkl")
-    loaded_unigram_bpe = BaseTokenizer.load_tokenizer("unigram_bpe_tokenizer.pkl")
+    unigram_bpe.save_binary("unigram_bpe_tokenizer.bin")
+    loaded_unigram_bpe = UnigramBPETokenizer()
+    loaded_unigram_bpe.load_binary("unigram_bpe_tokenizer.bin")
 
     # Preprocess and tokenize a new text
     new_text = "hello world!"
@@ -0,0 +1,83 @@
+from .lexicon_index import LexiconIndex, open_lexicon_index
+from .lru_cache import LRUCache
+
+
+class MorphoSegmenter:
+    """
+    Pré-segmentation morphologique (voir BaseTokenizer.enable_morpho_segmentation) :
+    découpe un mot selon sa segmentation dans le lexique (train.csv), lue dans
+    l'index mmappé de lexicon_index, avec un cache LRU borné des mots déjà vus.
+
+    Seules les segmentations de surface sont appliquées : si les morphèmes ne
+    recomposent pas le mot (segmentation canonique, ex. "happiness" ->
+    "happy-ness"), le mot reste entier, pour que le décodage et les offsets
+    restent exacts.
+    """
+
+    def __init__(self, lexicon="train.csv", cache_size=100000, separator="-"):
+        """
+        Args:
+            lexicon: chemin du lexique CSV (index construit une fois à côté),
+                d'un index .idx déjà construit, ou Mapping mot -> segmentation
+            cache_size (int): nombre de mots gardés en cache
+            separator (str): séparateur des morphèmes dans la segmentation
+        """
+        if isinstance(lexicon, str):
+            lexicon = LexiconIndex(lexicon) if lexicon.endswith(".idx") else open_lexicon_index(lexicon)
+        self.lexicon = lexicon
+        self.separator = separator
+        self.cache = LRUCache(cache_size)
+
+    def __getstate__(self):
+        # Le cache n'est pas copié dans les workers ; l'index se rouvre par son chemin
+        state = self.__dict__.copy()
+        state["cache"] = LRUCache(self.cache.capacity)
+        return state
+
+    def morpheme_lengths(self, word):
+        """
+        Returns:
+            tuple: longueur (en caractères) de chaque morphème de `word` ; vide
+                si le mot est absent du lexique ou n'a qu'un morphème
+        """
+        lengths = self.cache.get(word)
+        if lengths is None:
+            lengths = self._lookup(word)
+            self.cache.put(word, lengths)
+        return lengths
+
+    def _lookup(self, word):
+        lowered = word.lower()
+        segmentation = self.lexicon.get(word)
+        if segmentation is None and lowered != word:
+            segmentation = self.lexicon.get(lowered)
+        if segmentation is None or len(lowered) != len(word):
+            return ()
+        morphemes = [m for m in segmentation.split(self.separator) if m]
+        if len(morphemes) < 2 or "".join(morphemes).lower() != lowered:
+            return ()
+        return tuple(len(m) for m in morphemes)
+
+    def split(self, chunk):
+        """
+        Découpe un mot ou un morceau pré-tokenisé en morphèmes ; l'espace
+        de tête éventuel (" mot") reste attaché au premier morphème.
+
+        Returns:
+            List[str]: morceaux dont la concaténation redonne `chunk`
+        """
+        word = chunk.lstrip()
+        lengths = self.morpheme_lengths(word) if word else ()
+        if not lengths:
+            return [chunk]
+        pieces = []
+        start = 0
+        end = len(chunk) - len(word)
+        for length in lengths:
+            end += length
+            pieces.append(chunk[start:end])
+            start = end
+        return pieces
+
+    def stats(self):
+        return self.cache.stats()
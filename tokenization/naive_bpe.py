@@ -1,74 +1,190 @@
+import heapq
+import os
 import regex as re
-from base_tokenizer import BaseTokenizer
+from array import array
+from time import perf_counter
+from .base_tokenizer import BaseTokenizer
+from .bpe_trainer import GPT2_SPLIT_PATTERN, prepare_training_words, train_merges
+from .checkpoint import BpeCheckpointer, corpus_digest, load_checkpoint
+from .offsets import encode_with_char_map, extend_char_map, token_spans
 
 class NaiveBpe(BaseTokenizer):
     def __init__(self, pattern=None):
         super().__init__()  # Initialise vocab et merges depuis BaseTokenizer
         self.pattern = re.compile(pattern) if pattern else None
+        # Statistiques du dernier entraînement
+        self.train_stats = {}
+        # Vrai si aucune fusion ne traverse une frontière de morceau (entraînement dédupliqué)
+        self.chunk_boundaries = False
 
-    def train(self, corpus, vocab_size):
+    def train(self, corpus, vocab_size, dedup=False, num_workers=None, backend="incremental",
+              checkpoint_path=None, checkpoint_interval=1000, extend=False):
         """
         Entraîne le modèle BPE sur un corpus pour générer un vocabulaire de taille cible.
 
         Args:
             corpus (str): texte d'entraînement
             vocab_size (int): taille du vocabulaire final (minimum 256 pour les octets de base)
+            dedup (bool): entraîne sur les morceaux uniques pondérés par leur fréquence
+                (mémoire proportionnelle au nombre de mots distincts, pas de fusion
+                entre deux morceaux)
+            num_workers (int | None): répartit les morceaux uniques sur ce nombre de
+                processus (requiert dedup=True) ; fusions identiques au mode séquentiel
+            backend (str): "incremental" (par défaut) ou "numpy" (noyau vectorisé,
+                voir numpy_kernel)
+            checkpoint_path (str | None): point de reprise (voir checkpoint), écrit
+                toutes les `checkpoint_interval` fusions et en fin d'entraînement ;
+                s'il existe déjà, l'entraînement repart de là (résultat identique
+                à un entraînement ininterrompu, y compris avec un vocab_size plus grand)
+            extend (bool): continue à partir des fusions du modèle courant
+                (entraîné ou chargé) au lieu de repartir de zéro
+
+        Avec la pré-segmentation morphologique (enable_morpho_segmentation),
+        l'entraînement porte sur les morphèmes uniques : dedup est alors implicite.
         """
         assert vocab_size >= 256
+        dedup = dedup or self._morpho is not None
+        if num_workers and not dedup:
+            raise ValueError("num_workers requires dedup=True (shards are sets of unique chunks).")
         num_merges = vocab_size - 256
-        merges = {}
         vocab = {idx: bytes([idx]) for idx in range(256)}
+        prof = self._profiler
+        if prof is not None:
+            start = perf_counter()
 
-        # Encodage du corpus en UTF-8 et segmentation éventuelle par regex
-        if self.pattern:
-            text_chunks = re.findall(self.pattern, corpus)
-            tokens = [list(chunk.encode("utf-8")) for chunk in text_chunks]
-            tokens = [item for sublist in tokens for item in sublist]
+        meta = None
+        if checkpoint_path is not None:
+            meta = {"kind": "naive_bpe", "dedup": dedup, "pattern": self.pattern.pattern if self.pattern else None,
+                    "morpho": self._morpho is not None, "corpus_crc": corpus_digest(corpus)}
+        if checkpoint_path is not None and os.path.exists(checkpoint_path):
+            # Reprise : mots dans l'état du point de reprise, fusions déjà apprises
+            state = load_checkpoint(checkpoint_path)
+            saved = state["meta"]
+            for key in ("kind", "dedup", "pattern", "morpho", "corpus_crc"):
+                if saved.get(key) != meta[key]:
+                    raise ValueError(f"Checkpoint {checkpoint_path} does not match this training run ({key}).")
+            words, weights, train_stats = state["words"], state["weights"], saved["train_stats"]
+            done = {(a, b): new for a, b, new in state["merges"]}
         else:
-            tokens = list(corpus.encode("utf-8"))
-
-        # Apprentissage des fusions les plus fréquentes
-        for i in range(num_merges):
-            stat = stats(tokens)
-            if not stat:
-                break
-
-            pair = max(stat, key=stat.get)
-            idx = 256 + i
-            tokens = merge(tokens, pair, idx)
-            merges[pair] = idx
+            # Encodage du corpus en UTF-8 et segmentation éventuelle par regex
+            segment = self._morpho.split if self._morpho is not None else None
+            words, weights, train_stats = prepare_training_words(corpus, self.pattern, dedup, segment)
+            done = {}
+            if extend and self.merges:
+                if self.chunk_boundaries != dedup:
+                    raise ValueError("extend requires the same dedup setting as the existing model.")
+                # Rejouer les fusions existantes redonne l'état du moteur à la fin de leur apprentissage
+                done = dict(self.merges.items())
+                words = [encode_ranked(word, done) for word in words]
+        if prof is not None:
+            prof.add_time("prepare", perf_counter() - start)
+            start = perf_counter()
+
+        # Apprentissage incrémental des fusions les plus fréquentes
+        merges = dict(list(done.items())[:num_merges])
+        remaining = num_merges - len(merges)
+        if remaining > 0:
+            checkpoint = None
+            if checkpoint_path is not None:
+                meta["train_stats"] = train_stats
+                checkpoint = BpeCheckpointer(checkpoint_path, meta, checkpoint_interval,
+                                             [(a, b, new) for (a, b), new in done.items()])
+            merges.update(train_merges(words, weights, remaining, num_workers, backend,
+                                       start_idx=256 + len(done), progress=self._training_progress(remaining),
+                                       checkpoint=checkpoint))
+        del words
+        if prof is not None:
+            prof.add_time("train", perf_counter() - start)
+        for pair, idx in merges.items():
             vocab[idx] = vocab[pair[0]] + vocab[pair[1]]
+        train_stats["num_merges"] = len(merges)
 
         # Mise à jour des attributs hérités
         self.vocab = vocab
         self.merges = merges
+        self.train_stats = train_stats
+        self.chunk_boundaries = dedup
+        self._warn_if_cache_unused()
 
-    def tokenize(self, text):
+    def tokenize(self, text, return_offsets=False):
         """
         Tokenise un texte en appliquant les fusions BPE apprises.
 
         Args:
             text (str): texte brut
+            return_offsets (bool): renvoie aussi les spans (début, fin) en
+                caractères de chaque token dans `text`
         Returns:
-            List[int]: liste d'IDs de tokens
+            List[int]: liste d'IDs de tokens ; avec return_offsets, tuple
+                (IDs, array('i') à plat [début0, fin0, début1, fin1, ...])
         """
+        if return_offsets:
+            return self._tokenize_with_offsets(text)
+        prof = self._profiler
+        if prof is not None:
+            start = perf_counter()
+        if self.chunk_boundaries or self._morpho is not None:
+            # Les fusions ne traversent jamais un morceau : encodage morceau par morceau
+            chunks = self._split_morphemes(re.findall(self.pattern or GPT2_SPLIT_PATTERN, text))
+            if prof is not None:
+                prof.add_time("split", perf_counter() - start)
+            tokens = []
+            for ids in self._encode_units(chunks, self._encode_chunk):
+                tokens.extend(ids)
+            return tokens
+
         if self.pattern:
             text_chunks = re.findall(self.pattern, text)
             tokens = [list(chunk.encode("utf-8")) for chunk in text_chunks]
             tokens = [item for sublist in tokens for item in sublist]
         else:
             tokens = list(text.encode("utf-8"))
+        if prof is None:
+            # Appliquer les merges appris dans l'ordre
+            return encode_ranked(tokens, self.merges)
+
+        prof.add_time("split", perf_counter() - start)
+        start = perf_counter()
+        ids = encode_ranked(tokens, self.merges)
+        prof.add_time("merge", perf_counter() - start)
+        prof.count("bytes", len(tokens))
+        prof.count("merges_applied", len(tokens) - len(ids))
+        return ids
 
-        # Appliquer les merges appris dans l'ordre
-        while len(tokens) >= 2:
-            stat = stats(tokens)
-            pair = min(stat, key=lambda p: self.merges.get(p, float("inf")))
-            if pair not in self.merges:
-                break
-            idx = self.merges[pair]
-            tokens = merge(tokens, pair, idx)
+    def _uses_unit_cache(self):
+        return self.chunk_boundaries or self._morpho is not None
 
-        return tokens
+    def _split_pattern(self):
+        # Modèle entraîné par morceaux : tokenize() découpe avec GPT2_SPLIT_PATTERN à défaut de motif
+        if self.chunk_boundaries or self._morpho is not None:
+            return self.pattern or GPT2_SPLIT_PATTERN
+        return self.pattern
+
+    def _tokenize_with_offsets(self, text):
+        # Même découpage que tokenize(), en suivant la position d'origine de chaque octet
+        chunk_boundaries = self.chunk_boundaries or self._morpho is not None
+        pattern = self.pattern or (GPT2_SPLIT_PATTERN if chunk_boundaries else None)
+        pieces = [(m.start(), m.group()) for m in re.finditer(pattern, text)] if pattern else [(0, text)]
+        if chunk_boundaries:
+            pieces = self._split_morpheme_pieces(pieces)
+            ids = []
+            for chunk_ids in self._encode_units([chunk for _, chunk in pieces], self._encode_chunk):
+                ids.extend(chunk_ids)
+            char_map = array('i')
+            for start, chunk in pieces:
+                extend_char_map(char_map, start, chunk)
+        else:
+            tokens, char_map = encode_with_char_map(pieces)
+            ids = encode_ranked(tokens, self.merges)
+        return ids, token_spans(char_map, [len(self.vocab[t]) for t in ids])
+
+    def _encode_chunk(self, chunk):
+        tokens = list(chunk.encode("utf-8"))
+        ids = encode_ranked(tokens, self.merges)
+        if self._profiler is not None:
+            self._profiler.count("bytes", len(tokens))
+            self._profiler.count("merges_applied", len(tokens) - len(ids))
+        return ids
 
     def decode(self, tokens):
         """
@@ -102,3 +218,46 @@ def merge(tokens, pair, rep):
             new_text.append(tokens[i])
             i += 1
     return new_text
+
+# Applique les fusions par ordre de rang sur une liste chaînée de symboles.
+# Résultat identique à la boucle stats()/min()/merge(), mais chaque fusion
+# n'est appliquée que localement : O(n log n) au lieu de O(n * fusions).
+def encode_ranked(tokens, merges):
+    n = len(tokens)
+    if n < 2:
+        return list(tokens)
+    ids = list(tokens)
+    nxt = list(range(1, n + 1))
+    nxt[-1] = -1
+    prev = list(range(-1, n - 1))
+
+    # Tas de (rang, position) ; le rang d'une paire est l'ID du token fusionné
+    heap = []
+    for i in range(n - 1):
+        rank = merges.get((ids[i], ids[i + 1]))
+        if rank is not None:
+            heap.append((rank, i))
+    heapq.heapify(heap)
+
+    while heap:
+        rank, p = heapq.heappop(heap)
+        q = nxt[p]
+        # Entrée obsolète : symbole absorbé ou voisinage modifié depuis l'insertion
+        if ids[p] == -1 or q == -1 or merges.get((ids[p], ids[q])) != rank:
+            continue
+        ids[p] = rank
+        ids[q] = -1
+        right = nxt[q]
+        nxt[p] = right
+        if right != -1:
+            prev[right] = p
+            new_rank = merges.get((rank, ids[right]))
+            if new_rank is not None:
+                heapq.heappush(heap, (new_rank, p))
+        left = prev[p]
+        if left != -1:
+            new_rank = merges.get((ids[left], rank))
+            if new_rank is not None:
+                heapq.heappush(heap, (new_rank, left))
+
+    return [t for t in ids if t != -1]
@@ -0,0 +1,124 @@
+try:
+    import numpy as np
+except ImportError:  # dépendance optionnelle, uniquement pour backend="numpy"
+    np = None
+
+# Séparateur entre deux mots dans le flux de tokens : aucune paire ne le traverse
+SEPARATOR = -1
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("The numpy backend requires numpy (pip install numpy).")
+
+
+def to_array(words, weights=None):
+    """
+    Concatène les mots en un tableau int32, séparés par SEPARATOR.
+
+    Returns:
+        tuple: (tokens, poids par position ou None)
+    """
+    _require_numpy()
+    total = sum(len(word) for word in words) + max(0, len(words) - 1)
+    tokens = np.full(total, SEPARATOR, dtype=np.int32)
+    position_weights = np.zeros(total, dtype=np.int64) if weights is not None else None
+    pos = 0
+    for i, word in enumerate(words):
+        tokens[pos:pos + len(word)] = word
+        if position_weights is not None:
+            position_weights[pos:pos + len(word)] = weights[i]
+        pos += len(word) + 1
+    return tokens, position_weights
+
+
+def pair_counts(tokens, weights=None):
+    """
+    Compte les paires adjacentes : chaque paire est empaquetée dans une clé
+    int64 (gauche << 32 | droite), puis np.unique / np.bincount.
+
+    Returns:
+        tuple: (clés uniques, comptes, position de la première occurrence)
+    """
+    left = tokens[:-1]
+    right = tokens[1:]
+    positions = np.flatnonzero((left != SEPARATOR) & (right != SEPARATOR))
+    keys = (left[positions].astype(np.int64) << 32) | right[positions].astype(np.int64)
+    unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    if weights is None:
+        counts = np.bincount(inverse, minlength=len(unique_keys))
+    else:
+        counts = np.bincount(inverse, weights=weights[positions], minlength=len(unique_keys)).astype(np.int64)
+    return unique_keys, counts, positions[first]
+
+
+def best_pair(tokens, weights=None):
+    """
+    Paire la plus fréquente ; à égalité, celle qui apparaît le plus tôt
+    (même départage que max() sur stats()).
+
+    Returns:
+        tuple | None: ((gauche, droite), compte)
+    """
+    if len(tokens) < 2:
+        return None
+    keys, counts, first = pair_counts(tokens, weights)
+    if len(keys) == 0:
+        return None
+    candidates = np.flatnonzero(counts == counts.max())
+    best = candidates[np.argmin(first[candidates])]
+    key = int(keys[best])
+    return (key >> 32, key & 0xFFFFFFFF), int(counts[best])
+
+
+def merge_pair(tokens, pair, rep, weights=None):
+    """
+    Remplace les occurrences de `pair` par `rep` avec des masques vectorisés.
+
+    Pour une paire (a, a), les occurrences consécutives forment des séries
+    (ex. "aaa" donne les positions 0 et 1) ; comme merge(), on ne garde que
+    les positions de rang pair dans chaque série, de gauche à droite.
+
+    Returns:
+        tuple: (nouveaux tokens, nouveaux poids ou None)
+    """
+    a, b = pair
+    matches = np.flatnonzero((tokens[:-1] == a) & (tokens[1:] == b))
+    if len(matches) == 0:
+        return tokens, weights
+    if a == b and len(matches) > 1:
+        run_breaks = np.empty(len(matches), dtype=bool)
+        run_breaks[0] = True
+        run_breaks[1:] = np.diff(matches) != 1
+        run_starts = np.maximum.accumulate(np.where(run_breaks, matches, 0))
+        matches = matches[(matches - run_starts) % 2 == 0]
+
+    keep = np.ones(len(tokens), dtype=bool)
+    keep[matches + 1] = False
+    tokens = tokens.copy()
+    tokens[matches] = rep
+    return tokens[keep], (weights[keep] if weights is not None else None)
+
+
+def train(words, weights, num_merges, start_idx=256, progress=None):
+    """
+    Boucle d'entraînement BPE sur le noyau NumPy.
+
+    Returns:
+        dict: (id1, id2) -> nouvel ID, dans l'ordre des fusions
+    """
+    tokens, position_weights = to_array(words, weights)
+    merges = {}
+    for i in range(num_merges):
+        best = best_pair(tokens, position_weights)
+        if best is None:
+            break
+        pair, _ = best
+        idx = start_idx + i
+        tokens, position_weights = merge_pair(tokens, pair, idx, position_weights)
+        merges[pair] = idx
+        if progress is not None:
+            progress.update(i + 1)
+    if progress is not None:
+        progress.finish(len(merges))
+    return merges
@@ -0,0 +1,70 @@
+from array import array
+
+# Suivi des positions de caractères pendant l'encodage (mode return_offsets).
+# Une table `char_map` associe à chaque unité du texte transformé (caractère
+# prétraité ou octet UTF-8) l'indice du caractère d'origine ; les spans des
+# tokens s'en déduisent sans seconde passe de recherche dans le texte.
+
+
+def _utf8_len(code):
+    if code < 0x80:
+        return 1
+    if code < 0x800:
+        return 2
+    if code < 0x10000:
+        return 3
+    return 4
+
+
+def extend_char_map(char_map, start, chunk):
+    """
+    Ajoute à `char_map` l'indice d'origine de chaque octet UTF-8 de `chunk`,
+    qui commence au caractère `start` du texte.
+    """
+    if chunk.isascii():
+        char_map.extend(range(start, start + len(chunk)))
+        return
+    for i, ch in enumerate(chunk):
+        char_map.extend([start + i] * _utf8_len(ord(ch)))
+
+
+def encode_with_char_map(pieces):
+    """
+    Encode des morceaux de texte en UTF-8 en gardant la position d'origine
+    de chaque octet.
+
+    Args:
+        pieces (Iterable[Tuple[int, str]]): (position de départ, morceau)
+    Returns:
+        tuple: (liste des octets, array('i') position d'origine par octet)
+    """
+    data = bytearray()
+    char_map = array('i')
+    for start, chunk in pieces:
+        data += chunk.encode("utf-8")
+        extend_char_map(char_map, start, chunk)
+    return list(data), char_map
+
+
+def token_spans(char_map, lengths):
+    """
+    Spans (début, fin) en caractères d'origine de tokens consécutifs.
+
+    Args:
+        char_map (array): position d'origine de chaque unité encodée
+        lengths (Iterable[int]): nombre d'unités couvertes par chaque token
+    Returns:
+        array: array('i') à plat [début0, fin0, début1, fin1, ...]
+    """
+    spans = array('i')
+    pos = 0
+    for length in lengths:
+        if length:
+            spans.append(char_map[pos])
+            spans.append(char_map[pos + length - 1] + 1)
+        else:
+            start = char_map[pos] if pos < len(char_map) else (char_map[-1] + 1 if char_map else 0)
+            spans.append(start)
+            spans.append(start)
+        pos += length
+    return spans
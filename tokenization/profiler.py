@@ -0,0 +1,107 @@
+import sys
+import time
+from collections import Counter
+
+
+class Profiler:
+    """
+    Chronomètres par phase et compteurs d'un tokenizer (voir
+    BaseTokenizer.enable_profiling). Les chemins critiques ne testent que
+    `self._profiler is not None` : sans profiler, le coût est négligeable.
+
+    Les callbacks reçoivent (événement, donnée) : le nom de la phase et sa
+    durée en secondes après chaque mesure, ou "train_progress" et le dict de
+    TrainingProgress pendant un entraînement.
+    """
+
+    def __init__(self):
+        # phase -> [durée totale (s), nombre d'appels]
+        self.timers = {}
+        self.counters = Counter()
+        self.callbacks = []
+
+    def add_time(self, phase, elapsed):
+        timer = self.timers.get(phase)
+        if timer is None:
+            self.timers[phase] = [elapsed, 1]
+        else:
+            timer[0] += elapsed
+            timer[1] += 1
+        for callback in self.callbacks:
+            callback(phase, elapsed)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def emit(self, event, data):
+        for callback in self.callbacks:
+            callback(event, data)
+
+    def add_callback(self, callback):
+        self.callbacks.append(callback)
+
+    def reset(self):
+        self.timers.clear()
+        self.counters.clear()
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: "timers" (durée totale, appels, durée moyenne par phase),
+                "counters" et "derived" (recherches par octet, taux de hits du cache)
+        """
+        counters = dict(self.counters)
+        derived = {}
+        if counters.get("bytes") and "vocab_lookups" in counters:
+            derived["lookups_per_byte"] = counters["vocab_lookups"] / counters["bytes"]
+        lookups = counters.get("cache_hits", 0) + counters.get("cache_misses", 0)
+        if lookups:
+            derived["cache_hit_rate"] = counters.get("cache_hits", 0) / lookups
+        return {
+            "timers": {phase: {"total_s": total, "calls": calls, "mean_s": total / calls}
+                       for phase, (total, calls) in self.timers.items()},
+            "counters": counters,
+            "derived": derived,
+        }
+
+
+class TrainingProgress:
+    """
+    Suivi d'une boucle d'entraînement : fusions par seconde et estimation du
+    temps restant, transmis à `report` au plus une fois par `interval` secondes
+    (et toujours à la dernière étape).
+    """
+
+    def __init__(self, total, report=None, interval=0.5):
+        self.total = total
+        self.report = report or print_progress
+        self.interval = interval
+        self.start = time.perf_counter()
+        self._last = 0.0
+        self._reported = None
+
+    def update(self, done, **extra):
+        now = time.perf_counter()
+        if now - self._last < self.interval and done < self.total:
+            return
+        self._last = now
+        self._reported = done
+        elapsed = now - self.start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        self.report(dict(extra, done=done, total=self.total, elapsed_s=elapsed, merges_per_s=rate,
+                         eta_s=(self.total - done) / rate if rate else None))
+
+    def finish(self, done):
+        # Dernier rapport quand la boucle s'arrête avant `total` (plus de paire à fusionner)
+        if self._reported != done:
+            self.total = done
+            self.update(done)
+
+
+def print_progress(info):
+    # Affichage sur une ligne (stderr), mis à jour sur place
+    eta = f"{info['eta_s']:.1f} s" if info["eta_s"] is not None else "?"
+    sys.stderr.write(f"\r{info['done']}/{info['total']} merges | {info['merges_per_s']:.0f} merges/s | ETA {eta}   ")
+    if info["done"] >= info["total"]:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
@@ -0,0 +1,190 @@
+import heapq
+import multiprocessing as mp
+import os
+
+from .bpe_trainer import IncrementalBpeTrainer
+
+
+class _TrackingTrainer(IncrementalBpeTrainer):
+    # Moteur incrémental qui note les paires dont le compte ou la position a changé
+    def __init__(self, words, weights=None):
+        self.touched = set()
+        super().__init__(words, weights)
+
+    def _add(self, a, b, pos):
+        self.touched.add((a, b))
+        return super()._add(a, b, pos)
+
+    def _remove(self, a, b, pos):
+        self.touched.add((a, b))
+        super()._remove(a, b, pos)
+
+    def pair_state(self, pairs):
+        # (compte local, première position locale) de chaque paire ; (0, None) si disparue
+        return {pair: (self.counts[pair], self._first(pair)) if pair in self.counts else (0, None)
+                for pair in pairs}
+
+
+def _shard_worker(conn, words, weights):
+    trainer = _TrackingTrainer(words, weights)
+    del words
+    conn.send(trainer.pair_state(list(trainer.counts)))
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        if message == "export":
+            conn.send(trainer.export_words())
+            continue
+        pair, rep = message
+        trainer.touched = set()
+        trainer.merge(pair, rep)
+        conn.send(trainer.pair_state(trainer.touched))
+    conn.close()
+
+
+class ShardedBpeTrainer:
+    """
+    Entraînement BPE parallèle sur des mots pondérés, découpés en shards
+    contigus répartis sur un pool de processus.
+
+    Chaque worker garde ses propres comptes de paires et applique les fusions
+    à son shard ; il ne renvoie au coordinateur que l'état des paires touchées
+    par la dernière fusion (compte local, première position). Le coordinateur
+    tient les totaux et choisit la paire suivante avec la même clé que
+    IncrementalBpeTrainer (compte, puis première occurrence), donc la liste
+    des fusions est identique à celle de l'entraînement séquentiel.
+    """
+
+    def __init__(self, words, weights=None, num_workers=None):
+        num_workers = max(1, min(num_workers or os.cpu_count(), len(words)))
+        # Shards contigus de tailles (en symboles) équilibrées : la position
+        # globale d'une paire est alors position locale + base du shard
+        total = sum(len(word) for word in words)
+        bounds = [0]
+        acc = 0
+        for i, word in enumerate(words):
+            acc += len(word)
+            if acc >= total * len(bounds) / num_workers and len(bounds) < num_workers:
+                bounds.append(i + 1)
+        bounds.append(len(words))
+
+        self.bases = []
+        self.connections = []
+        self.processes = []
+        base = 0
+        for start, end in zip(bounds, bounds[1:]):
+            if start == end:
+                continue
+            parent, child = mp.Pipe()
+            shard_weights = weights[start:end] if weights is not None else None
+            process = mp.Process(target=_shard_worker, args=(child, words[start:end], shard_weights), daemon=True)
+            process.start()
+            child.close()
+            self.bases.append(base)
+            self.connections.append(parent)
+            self.processes.append(process)
+            base += sum(len(word) for word in words[start:end])
+
+        self.counts = {}
+        # Première position globale de chaque paire, par shard
+        self.firsts = {}
+        self.heap = []
+        self._apply([conn.recv() for conn in self.connections])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for conn in self.connections:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+        for process in self.processes:
+            process.join()
+        self.connections = []
+        self.processes = []
+
+    def _apply(self, states):
+        # Réduction des états envoyés par les shards
+        changed = set()
+        for shard, state in enumerate(states):
+            base = self.bases[shard]
+            for pair, (count, first) in state.items():
+                shard_firsts = self.firsts.setdefault(pair, {})
+                old = shard_firsts.pop(shard, None)
+                old_count = old[0] if old else 0
+                if count:
+                    shard_firsts[shard] = (count, base + first)
+                elif not shard_firsts:
+                    del self.firsts[pair]
+                total = self.counts.get(pair, 0) + count - old_count
+                if total:
+                    self.counts[pair] = total
+                    changed.add(pair)
+                else:
+                    self.counts.pop(pair, None)
+        for pair in changed:
+            if pair in self.counts:
+                heapq.heappush(self.heap, self._key(pair) + (pair,))
+
+    def _key(self, pair):
+        return -self.counts[pair], min(first for _, first in self.firsts[pair].values())
+
+    def best_pair(self):
+        heap = self.heap
+        while heap:
+            neg_count, first, pair = heap[0]
+            if pair not in self.counts:
+                heapq.heappop(heap)
+                continue
+            key = self._key(pair)
+            if key == (neg_count, first):
+                return pair, self.counts[pair]
+            heapq.heapreplace(heap, key + (pair,))
+        return None
+
+    def merge(self, pair, rep):
+        for conn in self.connections:
+            conn.send((pair, rep))
+        self._apply([conn.recv() for conn in self.connections])
+
+    def export_words(self):
+        # Mots des shards, dans l'ordre : même état que IncrementalBpeTrainer.export_words
+        for conn in self.connections:
+            conn.send("export")
+        words = []
+        weights = []
+        for conn in self.connections:
+            shard_words, shard_weights = conn.recv()
+            words.extend(shard_words)
+            if shard_weights is None:
+                weights = None
+            elif weights is not None:
+                weights.extend(shard_weights)
+        return words, weights
+
+    def train(self, num_merges, start_idx=256, progress=None, checkpoint=None):
+        merges = {}
+        for i in range(num_merges):
+            best = self.best_pair()
+            if best is None:
+                break
+            pair, _ = best
+            idx = start_idx + i
+            self.merge(pair, idx)
+            merges[pair] = idx
+            if progress is not None:
+                progress.update(i + 1)
+            if checkpoint is not None:
+                checkpoint(self, merges)
+        if progress is not None:
+            progress.finish(len(merges))
+        if checkpoint is not None:
+            checkpoint(self, merges, final=True)
+        return merges
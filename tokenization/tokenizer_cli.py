@@ -1,52 +1,222 @@
 import argparse
-from naive_bpe import NaiveBpe
-from dynamic_bpe import DynamicBpe
-from unigram_bpe import UnigramBPETokenizer
+import io
+import os
+import sys
+from array import array
+
+if not __package__:
+    # Exécution directe (python tokenization/tokenizer_cli.py) : rend le package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Entraîner une fois, encoder souvent :
+#   tokenizer_cli.py train naive corpus.txt -o model.bin --vocab_size 5000
+#   cat docs.txt | tokenizer_cli.py encode model.bin --workers 4 > ids.txt
+#   tokenizer_cli.py decode model.bin ids.txt
+# Un document par ligne ; en sortie texte, une ligne d'IDs par document.
+
+TOKENIZERS = ["naive", "dynamic", "unigram", "wordpiece"]
+
 
 def load_tokenizer(tokenizer_name, vocab_size=None, pattern=None):
+    # Imports différés : seul le tokenizer demandé est chargé
     if tokenizer_name == "naive":
+        from tokenization.naive_bpe import NaiveBpe
         return NaiveBpe(pattern)
     elif tokenizer_name == "dynamic":
+        from tokenization.dynamic_bpe import DynamicBpe
         return DynamicBpe(pattern)
     elif tokenizer_name == "unigram":
         if vocab_size is None:
             raise ValueError("Unigram tokenizer requires vocab_size.")
+        from tokenization.unigram_bpe import UnigramBPETokenizer
         return UnigramBPETokenizer(vocab_size)
+    elif tokenizer_name == "wordpiece":
+        from tokenization.worpiece_tokenizer import WordPieceTokenizer
+        return WordPieceTokenizer(vocab_size)
     else:
         raise ValueError(f"Unsupported tokenizer: {tokenizer_name}")
 
-def main():
-    parser = argparse.ArgumentParser(description="Tokenization CLI Tool")
-    parser.add_argument("tokenizer", choices=["naive", "dynamic", "unigram"], help="Tokenizer type")
-    parser.add_argument("corpus_file", help="Path to text corpus")
-    parser.add_argument("--vocab_size", type=int, default=300, help="Vocabulary size")
-    parser.add_argument("--pattern", type=str, help="Regex pattern to split corpus (optional)")
-    parser.add_argument("--test_text", type=str, help="Text to tokenize after training")
-    parser.add_argument("--decode", action="store_true", help="Decode tokenized output")
-    parser.add_argument("--benchmark", action="store_true", help="Benchmark tokenization time")
 
-    args = parser.parse_args()
+# Classe enregistrée dans le modèle binaire -> nom du tokenizer
+MODEL_CLASSES = {
+    "NaiveBpe": "naive",
+    "DynamicBpe": "dynamic",
+    "UnigramBPETokenizer": "unigram",
+    "WordPieceTokenizer": "wordpiece",
+}
+
+
+def load_model(path):
+    """Charge un modèle binaire (save_binary) dans un tokenizer de la classe enregistrée."""
+    from tokenization.binary_model import BinaryModel
+    model = BinaryModel(path)
+    try:
+        class_name = model.meta["class"]
+    finally:
+        model.close()
+    if class_name not in MODEL_CLASSES:
+        raise ValueError(f"Unsupported model class: {class_name}")
+    tokenizer = load_tokenizer(MODEL_CLASSES[class_name], vocab_size=0)
+    tokenizer.load_binary(path)
+    return tokenizer
 
+
+def open_input(path):
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def open_output(path, binary):
+    if path == "-":
+        if binary:
+            return sys.stdout.buffer
+        sys.stdout.reconfigure(encoding="utf-8")
+        return sys.stdout
+    return open(path, "wb") if binary else open(path, "w", encoding="utf-8")
+
+
+def cmd_train(args):
     with open(args.corpus_file, "r", encoding="utf-8") as f:
         corpus = f.read()
 
     tokenizer = load_tokenizer(args.tokenizer, args.vocab_size, args.pattern)
+    if args.morpho:
+        tokenizer.enable_morpho_segmentation(args.morpho)
+    print(f"Training {args.tokenizer} tokenizer...", file=sys.stderr)
+    if args.checkpoint and args.tokenizer != "naive":
+        raise ValueError("--checkpoint is only supported by the naive tokenizer.")
+    if args.tokenizer in ("naive", "dynamic"):
+        options = {}
+        if args.checkpoint:
+            options = {"checkpoint_path": args.checkpoint, "checkpoint_interval": args.checkpoint_interval}
+        tokenizer.train(corpus, args.vocab_size, dedup=args.dedup, num_workers=args.num_workers,
+                        backend=args.backend, **options)
+        if args.dedup:
+            print(f"Chunk deduplication reduced training data {tokenizer.train_stats['reduction_ratio']:.1f}x",
+                  file=sys.stderr)
+    elif args.tokenizer == "wordpiece":
+        tokenizer.train(corpus.splitlines())
+    else:
+        tokenizer.train(corpus, args.vocab_size)
+
+    tokenizer.save_binary(args.output)
+    print(f"Model written to {args.output} ({len(tokenizer.vocab)} tokens)", file=sys.stderr)
+
+
+def cmd_encode(args):
+    tokenizer = load_model(args.model)
+    if args.morpho:
+        tokenizer.enable_morpho_segmentation(args.morpho)
+    binary = args.format == "bin"
+    if args.text is not None:
+        texts = [args.text]
+        source = None
+    else:
+        source = open_input(args.input)
+        texts = (line.rstrip("\n") for line in source)
+
+    out = open_output(args.output, binary)
+    count = 0
+    documents = 0
+    try:
+        for ids in tokenizer.encode_stream(texts, args.batch_size, args.workers):
+            if ids and min(ids) < 0:
+                raise ValueError(f"Invalid token id {min(ids)} in document {documents + 1}.")
+            if binary:
+                try:
+                    out.write(array(args.typecode, ids).tobytes())
+                except OverflowError:
+                    raise ValueError(f"Token id {max(ids)} does not fit array typecode '{args.typecode}'.")
+            else:
+                out.write(" ".join(map(str, ids)) + "\n")
+            count += len(ids)
+            documents += 1
+    finally:
+        out.flush()
+        if source is not None and args.input != "-":
+            source.close()
+        if args.output != "-":
+            out.close()
+    print(f"{count} tokens written", file=sys.stderr)
+
+
+def cmd_decode(args):
+    tokenizer = load_model(args.model)
+    out = open_output(args.output, binary=False)
+    try:
+        if args.format == "bin":
+            ids = array(args.typecode)
+            with open(args.input, "rb") if args.input != "-" else sys.stdin.buffer as f:
+                ids.frombytes(f.read())
+            out.write(tokenizer.decode_ids(ids) + "\n")
+        else:
+            with open_input(args.input) as f:
+                for line in f:
+                    out.write(tokenizer.decode_ids([int(i) for i in line.split()]) + "\n")
+    finally:
+        out.flush()
+        if args.output != "-":
+            out.close()
+
+
+def cmd_benchmark(args):
+    tokenizer = load_model(args.model)
+    with open(args.input, "r", encoding="utf-8") as f:
+        tokenizer.benchmark_tokenization(f.read(), args.warmup, args.repeat)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tokenization CLI Tool")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train = commands.add_parser("train", help="Train a tokenizer and write a binary model")
+    train.add_argument("tokenizer", choices=TOKENIZERS, help="Tokenizer type")
+    train.add_argument("corpus_file", help="Path to text corpus")
+    train.add_argument("-o", "--output", required=True, help="Model file to write")
+    train.add_argument("--vocab_size", type=int, default=300, help="Vocabulary size")
+    train.add_argument("--pattern", type=str, help="Regex pattern to split corpus (optional)")
+    train.add_argument("--dedup", action="store_true", help="Train BPE on unique pre-tokenized chunks weighted by frequency")
+    train.add_argument("--num_workers", type=int, help="Processes for sharded BPE training (requires --dedup)")
+    train.add_argument("--backend", choices=["incremental", "numpy"], default="incremental", help="BPE training engine")
+    train.add_argument("--checkpoint", help="Resumable training checkpoint, reused if it exists (naive only)")
+    train.add_argument("--checkpoint_interval", type=int, default=1000, help="Merges between checkpoints")
+    train.add_argument("--morpho", help="Lexicon CSV (e.g. train.csv) for morpheme pre-segmentation")
+    train.set_defaults(func=cmd_train)
 
-    print(f"\n Training {args.tokenizer} tokenizer...")
-    tokenizer.train(corpus, args.vocab_size)
+    encode = commands.add_parser("encode", help="Encode one document per line with a trained model")
+    encode.add_argument("model", help="Model file written by train")
+    encode.add_argument("input", nargs="?", default="-", help="Input text file (default: stdin)")
+    encode.add_argument("-o", "--output", default="-", help="Output file (default: stdout)")
+    encode.add_argument("--text", help="Encode this text instead of the input file")
+    encode.add_argument("--format", choices=["text", "bin"], default="text",
+                        help="text: one line of ids per document; bin: flat array of ids")
+    encode.add_argument("--typecode", default="I", help="array typecode of binary ids (default: uint32)")
+    encode.add_argument("--batch_size", type=int, default=1000, help="Documents per batch")
+    encode.add_argument("--workers", type=int, default=None, help="Encoding processes (default: sequential)")
+    encode.add_argument("--morpho", help="Lexicon CSV used for morpheme pre-segmentation at training time")
+    encode.set_defaults(func=cmd_encode)
 
-    if args.benchmark:
-        print("\n Benchmarking tokenization...")
-        tokenizer.benchmark_tokenization(corpus)
+    decode = commands.add_parser("decode", help="Decode ids back to text")
+    decode.add_argument("model", help="Model file written by train")
+    decode.add_argument("input", nargs="?", default="-", help="Ids file (default: stdin)")
+    decode.add_argument("-o", "--output", default="-", help="Output file (default: stdout)")
+    decode.add_argument("--format", choices=["text", "bin"], default="text")
+    decode.add_argument("--typecode", default="I")
+    decode.set_defaults(func=cmd_decode)
 
-    if args.test_text:
-        print(f"\n Tokenizing: {args.test_text}")
-        encoded = tokenizer.tokenize(args.test_text) if args.tokenizer != "unigram" else tokenizer.tokenize(args.test_text)[0]
-        print("🧩 Tokens:", encoded)
+    benchmark = commands.add_parser("benchmark", help="Benchmark encoding of a file (one document per line)")
+    benchmark.add_argument("model", help="Model file written by train")
+    benchmark.add_argument("input", help="Text file to encode")
+    benchmark.add_argument("--warmup", type=int, default=1)
+    benchmark.add_argument("--repeat", type=int, default=3)
+    benchmark.set_defaults(func=cmd_benchmark)
 
-        if args.decode:
-            decoded = tokenizer.decode(encoded)
-            print("Decoded:", decoded)
+    args = parser.parse_args(argv)
+    try:
+        args.func(args)
+    except ValueError as e:
+        parser.exit(1, f"error: {e}\n")
 
 if __name__ == "__main__":
     main()
@@ -1,78 +1,282 @@
 from collections import Counter
 import math
-from base_tokenizer import BaseTokenizer
+from .base_tokenizer import BaseTokenizer
+from .char_trie import CharTrie
+
+# Marqueur de début de mot (comme '▁' dans WordPiece) : le premier sous-mot de
+# chaque mot le porte, ce qui permet à decode() de retrouver les espaces
+WORD_START = "▁"
+
 
 class UnigramBPETokenizer(BaseTokenizer):
-    def __init__(self, vocab_size=1000):
+    def __init__(self, vocab_size=1000, seed_size=None, max_piece_len=16, prune_fraction=0.25, em_iterations=2):
+        """
+        Args:
+            vocab_size (int): taille cible du vocabulaire
+            seed_size (int | None): nombre de sous-chaînes fréquentes du vocabulaire initial
+                (10 * vocab_size par défaut)
+            max_piece_len (int): longueur maximale d'un sous-mot
+            prune_fraction (float): fraction du vocabulaire supprimée à chaque tour d'élagage
+            em_iterations (int): nombre d'itérations EM entre deux élagages
+        """
         super().__init__()
+        if not 0 < prune_fraction < 1:
+            raise ValueError(f"prune_fraction must be in (0, 1), got {prune_fraction}")
         self.vocab_size = vocab_size
+        self.seed_size = seed_size
+        self.max_piece_len = max_piece_len
+        self.prune_fraction = prune_fraction
+        self.em_iterations = em_iterations
         self.vocab = set()
         self.word_freq = {}
+        # Log-probabilités apprises de chaque sous-mot
+        self.log_probs = {}
+        self._scored_trie = None
+        self._scored_trie_key = None
 
     def train(self, corpus, vocab_size=None):
+        """
+        Entraîne un modèle de langue unigramme : vocabulaire initial des
+        sous-chaînes les plus fréquentes, puis alternance EM (forward-backward)
+        et élagage des sous-mots dont la suppression coûte le moins en
+        vraisemblance (segmentation Viterbi).
+        """
         if vocab_size:
             self.vocab_size = vocab_size
 
         corpus = self.preprocess_text(corpus)
-        self.word_freq = Counter(corpus.split())
-        all_subwords = set()
+        # Unités d'entraînement : mots préfixés du marqueur, ou leurs morphèmes
+        # avec la pré-segmentation morphologique
+        self.word_freq = Counter()
+        for word, freq in Counter(corpus.split()).items():
+            for unit in self._word_units(word, WORD_START):
+                self.word_freq[unit] += freq
 
-        # Step 1: Initialize vocabulary with all subwords from the corpus
-        for word in self.word_freq:
-            for start in range(len(word)):
-                for end in range(start + 1, len(word) + 1):
-                    all_subwords.add(word[start:end])
-
-        self.vocab = set(all_subwords)
-        total_words = sum(self.word_freq.values())
-
-        # Step 2: Prune vocabulary down to target size based on loss
-        while len(self.vocab) > self.vocab_size:
-            subword_freq = Counter()
-            for word, freq in self.word_freq.items():
-                for i in range(len(word)):
-                    for j in range(i + 1, len(word) + 1):
-                        subword = word[i:j]
-                        if subword in self.vocab:
-                            subword_freq[subword] += freq
-
-            if not subword_freq:
+        # Step 1: vocabulaire initial = caractères + top-k sous-chaînes fréquentes
+        self.log_probs = self._seed_pieces()
+
+        # Step 2: EM puis élagage d'une fraction du vocabulaire à chaque tour
+        while True:
+            for _ in range(self.em_iterations):
+                self.log_probs = self._em_step()
+            if len(self.log_probs) <= self.vocab_size:
                 break
+            pruned = self._prune()
+            # Plus que des caractères (toujours gardés) : vocab_size est inatteignable
+            if len(pruned) == len(self.log_probs):
+                break
+            self.log_probs = pruned
 
-            log_probs = {sw: math.log(freq / total_words) for sw, freq in subword_freq.items()}
-            losses = {sw: -subword_freq[sw] * log_probs[sw] for sw in self.vocab if sw in log_probs}
+        self.vocab = set(self.log_probs)
+        self._vocab_trie = None
 
-            if not losses:
-                break
+    def _seed_pieces(self):
+        chars = Counter()
+        substrings = Counter()
+        for word, freq in self.word_freq.items():
+            for start in range(len(word)):
+                chars[word[start]] += freq
+                for end in range(start + 2, min(len(word), start + self.max_piece_len) + 1):
+                    substrings[word[start:end]] += freq
+
+        # Score freq * longueur, comme dans SentencePiece
+        seed_size = self.seed_size or 10 * self.vocab_size
+        scored = sorted(substrings.items(), key=lambda x: (-x[1] * len(x[0]), x[0]))
+        pieces = dict(chars)
+        for piece, freq in scored[:max(0, seed_size - len(chars))]:
+            pieces[piece] = freq * len(piece)
+
+        total = sum(pieces.values())
+        return {piece: math.log(score / total) for piece, score in pieces.items()}
+
+    def _em_step(self):
+        """
+        Une itération EM : comptes attendus par forward-backward sur chaque
+        mot distinct, puis renormalisation. Les caractères sont toujours gardés.
+        """
+        pieces = list(self.log_probs)
+        scores = [self.log_probs[p] for p in pieces]
+        trie = self._build_trie(pieces)
+        expected = [0.0] * len(pieces)
+
+        for word, freq in self.word_freq.items():
+            n = len(word)
+            edges = [list(trie.prefix_matches(word, start)) for start in range(n)]
+            alpha = [-math.inf] * (n + 1)
+            alpha[0] = 0.0
+            for start in range(n):
+                if alpha[start] == -math.inf:
+                    continue
+                for end, pid in edges[start]:
+                    alpha[end] = _logaddexp(alpha[end], alpha[start] + scores[pid])
+            if alpha[n] == -math.inf:
+                continue
+            beta = [-math.inf] * (n + 1)
+            beta[n] = 0.0
+            for start in range(n - 1, -1, -1):
+                for end, pid in edges[start]:
+                    beta[start] = _logaddexp(beta[start], scores[pid] + beta[end])
+            for start in range(n):
+                for end, pid in edges[start]:
+                    expected[pid] += freq * math.exp(alpha[start] + scores[pid] + beta[end] - alpha[n])
+
+        # Les sous-mots quasi jamais utilisés disparaissent ; les caractères restent
+        kept = {p: max(c, _MIN_EXPECTED) for p, c in zip(pieces, expected) if c >= _MIN_EXPECTED or len(p) == 1}
+        total = sum(kept.values())
+        return {p: math.log(c / total) for p, c in kept.items()}
+
+    def _prune(self):
+        """
+        Supprime prune_fraction des sous-mots : ceux dont le remplacement par
+        leur meilleure segmentation alternative réduit le moins la vraisemblance.
+        """
+        pieces = list(self.log_probs)
+        scores = [self.log_probs[p] for p in pieces]
+        trie = self._build_trie(pieces)
+
+        viterbi_freq = [0] * len(pieces)
+        for word, freq in self.word_freq.items():
+            for _, pid in _viterbi(word, trie, scores):
+                if pid >= 0:
+                    viterbi_freq[pid] += freq
+
+        losses = {}
+        for pid, piece in enumerate(pieces):
+            if len(piece) == 1:
+                continue
+            alternative = _viterbi(piece, trie, scores, skip=pid)
+            alt_score = sum(scores[a] for _, a in alternative if a >= 0)
+            losses[piece] = viterbi_freq[pid] * (scores[pid] - alt_score)
 
-            least_useful = min(losses, key=losses.get)
-            self.vocab.discard(least_useful)
+        num_chars = len(pieces) - len(losses)
+        # Au moins un sous-mot supprimé par tour, même si prune_fraction est petit
+        target = max(self.vocab_size, min(len(pieces) - 1, int(len(pieces) * (1 - self.prune_fraction))))
+        keep = sorted(losses, key=lambda p: (-losses[p], p))[:max(0, target - num_chars)]
+        kept = set(keep)
+        return {p: lp for p, lp in self.log_probs.items() if len(p) == 1 or p in kept}
+
+    def _build_trie(self, pieces):
+        trie = CharTrie()
+        for pid, piece in enumerate(pieces):
+            trie.add(piece, pid)
+        return trie
+
+    def _get_scored_trie(self):
+        # Trie (sous-mot -> indice du score), reconstruit si le modèle a changé
+        key = (id(self.vocab), len(self.vocab), id(self.log_probs))
+        if self._scored_trie is None or self._scored_trie_key != key:
+            pieces = sorted(self.vocab)
+            # Sans log-probabilités (vocabulaire chargé seul), score uniforme :
+            # Viterbi revient alors à minimiser le nombre de sous-mots
+            default = min(self.log_probs.values(), default=-1.0)
+            self._scored_trie = (self._build_trie(pieces), [self.log_probs.get(p, default) for p in pieces])
+            self._scored_trie_key = key
+        return self._scored_trie
 
     def tokenize(self, text):
-        text = self.preprocess_text(text)
-        words = text.split()
-        tokenized_words = {word: self._tokenize_word(word) for word in words}
+        words = self.preprocess_text(text).split()
+        marker = self._word_marker()
+        units = [self._word_units(word, marker) for word in words]
+        # Sous-mots de chaque unité, regroupés par mot
+        encoded = iter(self._encode_units([unit for word_units in units for unit in word_units], self._tokenize_word))
+        tokenized_words = {word: [token for _ in word_units for token in next(encoded)]
+                           for word, word_units in zip(words, units)}
         stats = self.get_token_stats(tokenized_words)
         return tokenized_words, stats
 
+    def _token_sequence(self, text):
+        # Tous les mots dans l'ordre, y compris les répétitions (le dict de tokenize() les fusionne)
+        marker = self._word_marker()
+        units = [unit for word in self.preprocess_text(text).split() for unit in self._word_units(word, marker)]
+        return [token for tokens in self._encode_units(units, self._tokenize_word) for token in tokens]
+
+    def _word_units(self, word, marker):
+        # Marqueur + mot ; avec la pré-segmentation morphologique, marqueur +
+        # premier morphème puis les morphèmes suivants, encodés séparément
+        if self._morpho is None:
+            return [marker + word]
+        parts = self._morpho.split(word)
+        return [marker + parts[0]] + parts[1:]
+
+    def _word_marker(self):
+        # Les modèles entraînés sans marqueur de début de mot encodent les mots nus
+        return WORD_START if WORD_START in self.vocab else ""
+
+    def _model_signature(self):
+        return super()._model_signature() + (id(self.log_probs),)
+
     def _tokenize_word(self, word):
+        """Segmentation Viterbi la plus probable selon les log-probabilités apprises."""
+        trie, scores = self._get_scored_trie()
         tokens = []
         position = 0
-
-        while position < len(word):
-            best_match = None
-            for end in range(position + 1, len(word) + 1):
-                candidate = word[position:end]
-                if candidate in self.vocab:
-                    best_match = candidate
-            if best_match:
-                tokens.append(best_match)
-                position += len(best_match)
-            else:
-                tokens.append(word[position])
-                position += 1
+        for end, _ in _viterbi(word, trie, scores):
+            tokens.append(word[position:end])
+            position = end
         return tokens
 
     def decode(self, token_dict):
-        """Decodes tokenized dictionary into string."""
-        return " ".join("".join(tokens) for tokens in token_dict.values())
+        """
+        Decodes tokenized dictionary into string. Pour une liste de sous-mots
+        (decode_ids), chaque marqueur de début de mot redevient un espace.
+        """
+        if not isinstance(token_dict, dict):
+            text = "".join(token_dict).replace(WORD_START, " ")
+            return text[1:] if text.startswith(" ") else text
+        return " ".join("".join(tokens).replace(WORD_START, "") for tokens in token_dict.values())
+
+
+def _logaddexp(a, b):
+    if a == -math.inf:
+        return b
+    if b == -math.inf:
+        return a
+    if a > b:
+        return a + math.log1p(math.exp(b - a))
+    return b + math.log1p(math.exp(a - b))
+
+
+# Compte attendu minimal pour qu'un sous-mot survive à une itération EM
+_MIN_EXPECTED = 0.5
+
+# Pénalité d'un caractère absent du vocabulaire
+_UNK_PENALTY = 10.0
+
+
+def _viterbi(word, trie, scores, skip=-1):
+    """
+    Meilleure segmentation de `word` ; renvoie la liste des (fin, indice du
+    sous-mot), avec -1 pour un caractère inconnu. `skip` exclut un sous-mot.
+    """
+    n = len(word)
+    unk_score = min(scores, default=0.0) - _UNK_PENALTY
+    best = [-math.inf] * (n + 1)
+    back = [None] * (n + 1)
+    best[0] = 0.0
+    for start in range(n):
+        if best[start] == -math.inf:
+            continue
+        matched_char = False
+        for end, pid in trie.prefix_matches(word, start):
+            if pid == skip:
+                continue
+            if end == start + 1:
+                matched_char = True
+            score = best[start] + scores[pid]
+            if score > best[end]:
+                best[end] = score
+                back[end] = (start, pid)
+        if not matched_char:
+            score = best[start] + unk_score
+            if score > best[start + 1]:
+                best[start + 1] = score
+                back[start + 1] = (start, -1)
+
+    path = []
+    i = n
+    while i > 0:
+        start, pid = back[i]
+        path.append((i, pid))
+        i = start
+    path.reverse()
+    return path
@@ -1,13 +1,18 @@
 import regex as re
 from typing import List, Tuple
+from array import array
+from time import perf_counter
 from .base_tokenizer import BaseTokenizer
+from .bpe_trainer import iter_string_merges
 import collections
 
 class WordPieceTokenizer(BaseTokenizer):
-    def __init__(self, vocab_size: int = 5000, min_frequency: int = 2):
+    def __init__(self, vocab_size: int = 5000, min_frequency: int = 2, scoring: str = "frequency"):
         super().__init__()
         self.vocab_size = vocab_size
         self.min_frequency = min_frequency
+        # "frequency" : paire la plus fréquente ; "wordpiece" : freq(ab) / (freq(a) * freq(b))
+        self.scoring = scoring
         self.special_tokens = {"[UNK]", "[CLS]", "[SEP]", "[PAD]", "[MASK]"}
         self.trained = False
 
@@ -22,7 +27,7 @@ class WordPieceTokenizer(BaseTokenizer):
             # isoler ponctuation
             text = re.sub(r'([.,!?;:])', r' \1 ', text)
             for w in text.split():
-                words.append(['▁'] + list(w))
+                words.extend(list(unit) for unit in self._word_units(w))
 
         # Vocab initial : caractères + tokens spéciaux
         char_vocab = {ch for word in words for ch in word}
@@ -31,70 +36,100 @@ class WordPieceTokenizer(BaseTokenizer):
         # Comptage initial de fréquences
         token_freqs = collections.Counter(tuple(word) for word in words)
 
-        # Croissance par fusion de paires fréquentes
-        while len(self.vocab) < self.vocab_size:
-            pair_counts = collections.defaultdict(int)
-            for tok_seq, freq in token_freqs.items():
-                for i in range(len(tok_seq) - 1):
-                    pair_counts[(tok_seq[i], tok_seq[i+1])] += freq
-            if not pair_counts:
+        # Croissance par fusion de paires : seuls les mots contenant la paire sont mis à jour
+        progress = self._training_progress(max(0, self.vocab_size - len(self.vocab)))
+        num_merges = 0
+        for best_pair, new_token, _ in iter_string_merges(token_freqs, self.scoring, self.min_frequency):
+            if len(self.vocab) >= self.vocab_size:
                 break
-
-            best_pair, best_freq = max(pair_counts.items(), key=lambda x: x[1])
-            if best_freq < self.min_frequency:
-                break
-
-            new_token = ''.join(best_pair)
             self.vocab.add(new_token)
             # enregistrer la fusion
             self.merges[best_pair] = new_token
-            # appliquer fusion sur tous les token_seq
-            new_freqs = collections.Counter()
-            for seq, freq in token_freqs.items():
-                merged = []
-                i = 0
-                while i < len(seq):
-                    if i < len(seq)-1 and (seq[i], seq[i+1]) == best_pair:
-                        merged.append(new_token)
-                        i += 2
-                    else:
-                        merged.append(seq[i])
-                        i += 1
-                new_freqs[tuple(merged)] += freq
-            token_freqs = new_freqs
+            num_merges += 1
+            if progress is not None:
+                progress.update(num_merges)
+        if progress is not None:
+            progress.finish(num_merges)
 
+        self._vocab_trie = None
         self.trained = True
 
-    def tokenize(self, text: str) -> List[str]:
+    def tokenize(self, text: str, return_offsets: bool = False):
         """
         Tokenisation gloutonne mot à mot en sous-tokens WordPiece.
+        Avec return_offsets, renvoie (tokens, array('i') des spans [début, fin]
+        de chaque token en caractères de `text`) ; le préfixe '▁' a un span vide.
         """
         if not self.trained:
             raise ValueError("Le tokenizer doit être entraîné avant utilisation.")
+        if return_offsets:
+            return self._tokenize_with_offsets(text)
 
         # Prétraitement identique à l'entraînement
         text = self.preprocess_text(text)
+        prof = self._profiler
+        if prof is not None:
+            start = perf_counter()
         text = re.sub(r'([.,!?;:])', r' \1 ', text)
+        if prof is not None:
+            prof.add_time("split", perf_counter() - start)
         tokens: List[str] = []
 
-        for w in text.split():
-            word = '▁' + w
-            i = 0
-            while i < len(word):
-                match = None
-                # tenter la plus longue sous-chaîne
-                for j in range(len(word), i, -1):
-                    sub = word[i:j]
-                    if sub in self.vocab:
-                        match = sub
-                        break
-                if match:
-                    tokens.append(match)
-                    i += len(match)
-                else:
-                    tokens.append("[UNK]")
-                    i += 1
-                    break
+        units = [unit for w in text.split() for unit in self._word_units(w)]
+        for word_tokens in self._encode_units(units, self._tokenize_piece):
+            tokens.extend(word_tokens)
+        return tokens
+
+    def _tokenize_with_offsets(self, text: str) -> Tuple[List[str], array]:
+        processed, char_map = self.preprocess_text_with_offsets(text)
+        tokens: List[str] = []
+        spans = array('i')
+        # Mêmes mots que re.sub(r'([.,!?;:])', r' \1 ', text).split(), avec leurs positions
+        for match in re.finditer(r'[.,!?;:]|[^\s.,!?;:]+', processed):
+            position = match.start()
+            for unit in self._word_units(match.group()):
+                end = position + len(unit) - unit.startswith('▁')
+                for token in self._encode_units([unit], self._tokenize_piece)[0]:
+                    # Le préfixe '▁' n'occupe aucun caractère ; [UNK] couvre la fin du mot (ou du morphème)
+                    if token == "[UNK]":
+                        length = end - position
+                    else:
+                        length = len(token) - token.startswith('▁')
+                    tokens.append(token)
+                    spans.append(char_map[position] if position < end else char_map[end - 1] + 1)
+                    spans.append(char_map[position + length - 1] + 1 if length else spans[-1])
+                    position += length
+                position = end
+        return tokens, spans
+
+    def _word_units(self, w: str) -> List[str]:
+        # '▁' + mot ; avec la pré-segmentation morphologique, '▁' + premier
+        # morphème puis les morphèmes suivants, encodés séparément
+        if self._morpho is None:
+            return ['▁' + w]
+        parts = self._morpho.split(w)
+        return ['▁' + parts[0]] + parts[1:]
+
+    def _tokenize_word(self, w: str) -> List[str]:
+        return self._tokenize_piece('▁' + w)
+
+    def _tokenize_piece(self, word: str) -> List[str]:
+        trie = self.get_vocab_trie()
+        tokens: List[str] = []
+        i = 0
+        while i < len(word):
+            # tenter la plus longue sous-chaîne
+            j = trie.longest_match(word, i)
+            if j > i:
+                tokens.append(word[i:j])
+                i = j
+            else:
+                tokens.append("[UNK]")
+                i += 1
+                break
+        if self._profiler is not None:
+            self._profiler.count("chars", len(word) - word.startswith('▁'))
+            self._profiler.count("vocab_lookups", len(tokens))
         return tokens
 
     def decode(self, tokens: List[str]) -> str:
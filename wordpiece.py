@@ -1,41 +1,91 @@
+import os
 import re
 import json
 import collections
-from typing import Dict, List, Tuple
+from typing import Dict, List
+
+from tokenization.bpe_trainer import iter_string_merges, iter_symbol_merges
+from tokenization.checkpoint import corpus_digest, load_checkpoint, save_checkpoint
+from tokenization.profiler import TrainingProgress
 
 
 class WordPieceVocabBuilder:
-    def __init__(self, vocab_size: int = 5000, min_frequency: int = 2):
+    def __init__(self, vocab_size: int = 5000, min_frequency: int = 2, scoring: str = "frequency",
+                 num_workers: int = None, verbose: bool = True):
         self.vocab_size = vocab_size
         self.min_frequency = min_frequency
+        # "frequency" : paire la plus fréquente ; "wordpiece" : freq(ab) / (freq(a) * freq(b))
+        self.scoring = scoring
+        # Nombre de processus pour le comptage des paires en shards (None : séquentiel)
+        self.num_workers = num_workers
+        # Affiche l'avancement (fusions/s, temps restant estimé) pendant build_vocab
+        self.verbose = verbose
         self.special_tokens = ["[UNK]", "[CLS]", "[SEP]", "[PAD]", "[MASK]"]
         self.vocab = {}
 
-    def build_vocab(self, corpus: List[str]) -> Dict[str, int]:
+    def build_vocab(self, corpus: List[str], checkpoint_path: str = None,
+                    checkpoint_interval: int = 1000) -> Dict[str, int]:
+        # checkpoint_path : point de reprise (voir tokenization.checkpoint) écrit toutes les
+        # checkpoint_interval fusions et à la fin ; s'il existe, la construction repart de là
+        # avec le même résultat qu'une construction ininterrompue, vocab_size plus grand compris
         words = self._preprocess_corpus(corpus)
-        char_vocab = self._get_initial_vocab(words)
-        vocab = {token: i for i, token in enumerate(self.special_tokens + list(char_vocab))}
-
-        word_tokens = [tuple(word) for word in words]  # Tokenisation initiale sous forme de tuples immuables
-        token_freqs = collections.Counter(word_tokens)
-
-        while len(vocab) < self.vocab_size:
-            token_counts = self._count_token_pairs(token_freqs)
-            if not token_counts:
-                break
-
-            best_pair, best_freq = max(token_counts.items(), key=lambda x: x[1])
-            if best_freq < self.min_frequency:
+        settings = {"kind": "wordpiece", "scoring": self.scoring, "min_frequency": self.min_frequency,
+                    "corpus_crc": corpus_digest(corpus)}
+        state = None
+        if checkpoint_path is not None and os.path.exists(checkpoint_path):
+            state = load_checkpoint(checkpoint_path)
+            for key, value in settings.items():
+                if state["meta"].get(key) != value:
+                    raise ValueError(f"Checkpoint {checkpoint_path} does not match this training run ({key}).")
+
+        if state is not None:
+            initial_size = state["meta"]["initial_size"]
+            vocab_list = state["strings"]["vocab"]
+            vocab = {token: i for i, token in enumerate(vocab_list[:max(self.vocab_size, initial_size)])}
+        else:
+            char_vocab = self._get_initial_vocab(words)
+            vocab = {token: i for i, token in enumerate(self.special_tokens + sorted(char_vocab))}
+            initial_size = len(vocab)
+
+        num_merges = 0
+        # Fusions acceptées lors du dernier point de reprise (0 : l'état du fichier est à jour)
+        saved = 0 if state is not None else None
+
+        def checkpoint(export, finished):
+            # Appelé quand toutes les fusions acceptées sont appliquées
+            nonlocal saved
+            if saved == num_merges:
+                return
+            if finished or len(vocab) >= self.vocab_size or num_merges - (saved or 0) >= checkpoint_interval:
+                words, weights, symbols = export()
+                save_checkpoint(checkpoint_path, dict(settings, initial_size=initial_size), words, weights,
+                                strings={"symbols": symbols, "vocab": list(vocab)})
+                saved = num_merges
+
+        on_step = checkpoint if checkpoint_path is not None else None
+        if state is None:
+            word_tokens = [tuple(word) for word in words]  # Tokenisation initiale sous forme de tuples immuables
+            token_freqs = collections.Counter(word_tokens)
+            merges = iter_string_merges(token_freqs, self.scoring, self.min_frequency, self.num_workers, on_step)
+        elif len(vocab_list) < self.vocab_size:
+            merges = iter_symbol_merges(state["words"], state["weights"], state["strings"]["symbols"],
+                                        self.scoring, self.min_frequency, self.num_workers, on_step)
+        else:
+            # Vocabulaire du point de reprise déjà assez grand : tronqué, rien à fusionner
+            merges = ()
+
+        # Fusions incrémentales : seuls les mots contenant la paire fusionnée sont mis à jour
+        progress = TrainingProgress(max(0, self.vocab_size - len(vocab))) if self.verbose else None
+        for best_pair, new_token, _ in merges:
+            if len(vocab) >= self.vocab_size:
                 break
-
-            new_token = ''.join(best_pair)
             vocab[new_token] = len(vocab)
+            num_merges += 1
+            if progress is not None:
+                progress.update(num_merges)  # Affichage en direct : fusions/s et temps restant
 
-            word_tokens, token_freqs = self._apply_merge(word_tokens, token_freqs, best_pair, new_token)
-
-            print(f"Nombre de tokens dans le vocabulaire : {len(vocab)}", end="\r")  # 🔥 Affichage en direct
-
-        print()  # Nouvelle ligne après la fin du processus
+        if progress is not None:
+            progress.finish(num_merges)
         self.vocab = {token: idx for idx, token in enumerate(vocab.keys())}
 
         return self.vocab
@@ -59,33 +109,6 @@ class WordPieceVocabBuilder:
     def _get_initial_vocab(self, words: List[List[str]]) -> set:
         return {char for word in words for char in word}
 
-    def _count_token_pairs(self, token_freqs: collections.Counter) -> Dict[Tuple[str, str], int]:
-        pair_counts = collections.defaultdict(int)
-        for word, freq in token_freqs.items():
-            for i in range(len(word) - 1):
-                pair_counts[(word[i], word[i + 1])] += freq
-        return pair_counts
-
-    def _apply_merge(self, word_tokens, token_freqs, pair, new_token):
-        new_word_tokens = []
-        new_token_freqs = collections.Counter()
-
-        for word, freq in token_freqs.items():
-            new_word = []
-            i = 0
-            while i < len(word):
-                if i < len(word) - 1 and (word[i], word[i + 1]) == pair:
-                    new_word.append(new_token)
-                    i += 2
-                else:
-                    new_word.append(word[i])
-                    i += 1
-            new_word = tuple(new_word)
-            new_word_tokens.append(new_word)
-            new_token_freqs[new_word] += freq
-
-        return new_word_tokens, new_token_freqs
-
     def save_vocab_json(self, path: str) -> None:
         if not self.vocab:
             raise ValueError("Le vocabulaire doit être construit avant d'être sauvegardé.")
@@ -111,6 +134,10 @@ if __name__ == "__main__":
     parser.add_argument("output_file", type=str, help="Chemin du fichier JSON de sortie")
     parser.add_argument("--vocab_size", type=int, default=5000, help="Taille du vocabulaire")
     parser.add_argument("--min_frequency", type=int, default=2, help="Fréquence minimale pour fusionner des tokens")
+    parser.add_argument("--num_workers", type=int, default=None, help="Nombre de processus pour l'entraînement parallèle")
+    parser.add_argument("--scoring", choices=["frequency", "wordpiece"], default="frequency", help="Critère de choix de la paire à fusionner")
+    parser.add_argument("--checkpoint", type=str, default=None, help="Point de reprise (repris s'il existe)")
+    parser.add_argument("--checkpoint_interval", type=int, default=1000, help="Fusions entre deux points de reprise")
 
     args = parser.parse_args()
 
@@ -119,8 +146,9 @@ if __name__ == "__main__":
         corpus = f.readlines()
 
     # Créer l'instance du builder et générer le vocabulaire
-    builder = WordPieceVocabBuilder(vocab_size=args.vocab_size, min_frequency=args.min_frequency)
-    vocab = builder.build_vocab(corpus)
+    builder = WordPieceVocabBuilder(vocab_size=args.vocab_size, min_frequency=args.min_frequency, scoring=args.scoring,
+                                    num_workers=args.num_workers)
+    vocab = builder.build_vocab(corpus, args.checkpoint, args.checkpoint_interval)
 
     # Sauvegarder le vocabulaire en JSON
     builder.save_vocab_list_json(args.output_file)